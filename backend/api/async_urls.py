@@ -0,0 +1,20 @@
+from django.urls import URLPattern
+
+from . import urls
+from .async_views import pooled
+
+app_name = 'api'
+
+ASYNC_READ_ROUTES = {
+    'recipes-list', 'recipes-detail',
+    'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail',
+}
+
+urlpatterns = [
+    URLPattern(
+        pattern.pattern, pooled(pattern.callback), pattern.default_args,
+        pattern.name
+    )
+    for pattern in urls.router.urls if pattern.name in ASYNC_READ_ROUTES
+] + urls.urlpatterns
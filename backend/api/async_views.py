@@ -0,0 +1,69 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_executor = ThreadPoolExecutor(
+    settings.ASYNC_READ_THREADS, thread_name_prefix='foodgram-read'
+)
+
+
+def pooled(view):
+    """Асинхронная обёртка синхронного представления для ASGI.
+
+    Django 3.2 выполняет синхронные представления под ASGI в одном
+    потоке, по одному запросу за раз. Запросы чтения здесь выполняются
+    в пуле из ASYNC_READ_THREADS потоков, у каждого потока своё
+    постоянное соединение с БД, поэтому они идут параллельно, а число
+    соединений воркера ограничено размером пула. Ответ DRF
+    рендерится там же, не занимая цикл событий. Изменяющие запросы
+    выполняются как обычно.
+
+    Перед запросом соединение потока проходит ту же проверку, что
+    в начале запроса Django: закрывается по CONN_MAX_AGE, а живость
+    проверяется только после DatabaseError на прошлом запросе.
+    """
+    def read(request, *args, **kwargs):
+        close_old_connections()
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    read = sync_to_async(read, thread_sensitive=False, executor=read_executor)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return async_view
+
+
+class AsyncReadPathMiddleware:
+    """Под ASGI направляет запросы в ASYNC_URLCONF, под WSGI пропускает."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if settings.ASYNC_URLCONF:
+            request.urlconf = settings.ASYNC_URLCONF
+        return await self.get_response(request)
@@ -0,0 +1,137 @@
+from django.core.cache import cache
+from django.db.models import CharField, Value
+from foodgram.global_constants import DOCUMENT_CACHE_TIMEOUT
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.versions import (AUTHOR_VERSION, INGREDIENTS_VERSION,
+                              RECIPE_VERSION, TAGS_VERSION, get_versions)
+from rest_framework import serializers
+
+from .metrics import timed_serializer
+from .serializers import RecipeDocumentSerializer
+
+DOCUMENT_KEY = 'recipe_document:{}:{}'
+
+
+def dependencies(recipe):
+    return (
+        RECIPE_VERSION.format(recipe.id),
+        AUTHOR_VERSION.format(recipe.author_id),
+        TAGS_VERSION,
+        INGREDIENTS_VERSION,
+    )
+
+
+def get_documents(recipes, variant):
+    """Документы рецептов из кэша, недостающие собираются одним запросом.
+
+    Документ хранится вместе с версиями рецепта, автора, тегов и
+    ингредиентов и пересобирается, если любая из них сменилась.
+    """
+    keys = {
+        recipe.id: DOCUMENT_KEY.format(variant, recipe.id)
+        for recipe in recipes
+    }
+    entries = cache.get_many(keys.values())
+    versions = get_versions({
+        name for recipe in recipes for name in dependencies(recipe)
+    })
+    documents, missing = {}, {}
+    for recipe in recipes:
+        current = {name: versions[name] for name in dependencies(recipe)}
+        entry = entries.get(keys[recipe.id])
+        if entry is not None and entry[0] == current:
+            documents[recipe.id] = entry[1]
+        else:
+            missing[recipe.id] = current
+    if missing:
+        built = timed_serializer(RecipeDocumentSerializer)(
+            Recipe.objects.with_related().filter(id__in=missing),
+            many=True,
+            context={'image_variant': variant}
+        ).data
+        cache.set_many(
+            {
+                keys[document['id']]: (missing[document['id']], document)
+                for document in built
+            },
+            DOCUMENT_CACHE_TIMEOUT
+        )
+        documents.update((document['id'], document) for document in built)
+    return documents
+
+
+def viewer_flags(user, recipe_ids):
+    """Рецепты из recipe_ids в избранном и в корзине пользователя."""
+    favorites, cart = set(), set()
+    if not user.is_authenticated or not recipe_ids:
+        return favorites, cart
+    relations = Favorite.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).annotate(
+        kind=Value('favorite', output_field=CharField())
+    ).values_list('recipe_id', 'kind').union(
+        ShoppingCart.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).annotate(
+            kind=Value('cart', output_field=CharField())
+        ).values_list('recipe_id', 'kind'),
+        all=True
+    )
+    for recipe_id, kind in relations:
+        (favorites if kind == 'favorite' else cart).add(recipe_id)
+    return favorites, cart
+
+
+def overlay(document, request, favorites, cart, subscriptions):
+    """Документ рецепта с отметками конкретного зрителя."""
+    author = document['author']
+    image = document['image']
+    return {
+        'id': document['id'],
+        'tags': document['tags'],
+        'author': {
+            **author,
+            'is_subscribed': author['id'] in subscriptions,
+        },
+        'ingredients': document['ingredients'],
+        'is_favorited': document['id'] in favorites,
+        'is_in_shopping_cart': document['id'] in cart,
+        'name': document['name'],
+        'image': request.build_absolute_uri(image) if image else image,
+        'text': document['text'],
+        'cooking_time': document['cooking_time'],
+    }
+
+
+def personalize(recipes, context):
+    request = context['request']
+    documents = get_documents(
+        recipes, context.get('image_variant', 'detail')
+    )
+    favorites, cart = viewer_flags(request.user, list(documents))
+    subscriptions = context.get('subscriptions', ())
+    return [
+        overlay(documents[recipe.id], request, favorites, cart, subscriptions)
+        for recipe in recipes if recipe.id in documents
+    ]
+
+
+class PersonalizedRecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        return personalize(list(data), self.context)
+
+
+class PersonalizedRecipeSerializer(serializers.BaseSerializer):
+    """Рецепт как в RecipeReadSerializer из кэшированного документа.
+
+    Общая часть берётся из get_documents, отметки избранного и корзины
+    загружаются одним запросом на страницу, подписки - из контекста.
+    Рецептам нужны только id и author_id.
+    """
+
+    class Meta:
+        list_serializer_class = PersonalizedRecipeListSerializer
+
+    def to_representation(self, recipe):
+        return personalize([recipe], self.context)[0]
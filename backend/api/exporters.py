@@ -0,0 +1,62 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_txt(ingredients):
+    yield 'Список покупок:\n\n'
+    for ingredient in ingredients:
+        yield (
+            f'{ingredient["name"]}, '
+            f'{ingredient["amount"]} '
+            f'{ingredient["measurement_unit"]} '
+            f'({", ".join(ingredient["recipes"])})\n'
+        )
+
+
+def export_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit', 'recipes'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['name'],
+            ingredient['amount'],
+            ingredient['measurement_unit'],
+            '; '.join(ingredient['recipes'])
+        ))
+
+
+def export_json(ingredients):
+    yield '['
+    for number, ingredient in enumerate(ingredients):
+        yield (',' if number else '') + json.dumps(
+            ingredient, ensure_ascii=False
+        )
+    yield ']'
+
+
+EXPORTERS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'json': (export_json, 'application/json'),
+}
+
+
+def export_shopping_list(ingredients, file_type):
+    """Потоковая выгрузка списка покупок в выбранном формате."""
+    exporter, content_type = EXPORTERS[file_type]
+    filename = f'shopping_list_{timezone.localdate():%Y-%m-%d}.{file_type}'
+    response = StreamingHttpResponse(
+        exporter(ingredients), content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
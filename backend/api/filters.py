@@ -1,27 +1,60 @@
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filter
-from recipes.models import Recipe
-from rest_framework.filters import SearchFilter
+from recipes.models import Recipe, Tag, TagInRecipe
+from recipes.rankings import RANKINGS, order_by_ranking
+from recipes.search import search_recipes
+from recipes.versions import TAGS_VERSION, get_version
 
+TAG_IDS_CACHE_KEY = 'tag_ids:{}'
 
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+
+def get_tag_ids():
+    """Соответствие слаг -> id тегов для текущей версии тегов."""
+    key = TAG_IDS_CACHE_KEY.format(get_version(TAGS_VERSION))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, None)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
 
 
 class RecipeFilter(filter.FilterSet):
     """Кастомный фильтр."""
 
-    tags = filter.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    tags = filter.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='get_tags'
     )
 
     is_favorited = filter.BooleanFilter(method='get_favorite')
     is_in_shopping_cart = filter.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filter.CharFilter(method='get_search')
+    ordering = filter.ChoiceFilter(
+        choices=[(ranking, ranking) for ranking in RANKINGS],
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'ordering'
+        )
+
+    def get_tags(self, queryset, name, value):
+        """Рецепты с любым из тегов, без дублей от соединения с тегами."""
+        tag_ids = get_tag_ids()
+        return queryset.filter(Exists(TagInRecipe.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[tag_ids[slug] for slug in value]
+        )))
 
     def get_favorite(self, queryset, name, value):
         if value:
@@ -32,3 +65,11 @@ class RecipeFilter(filter.FilterSet):
         if value:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        """Сортировка по заранее посчитанному рейтингу."""
+        return order_by_ranking(queryset, value)
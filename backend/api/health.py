@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import DatabaseError, connections
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+HEALTH_CACHE_KEY = 'health'
+
+
+@receiver(request_started)
+def close_broken_connections(**kwargs):
+    """Закрыть оборвавшиеся постоянные соединения перед запросом.
+
+    Django 3.2 переиспользует соединение CONN_MAX_AGE секунд, но не
+    проверяет, живо ли оно; мёртвое соединение закрывается, и первый
+    запрос к базе откроет новое.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def health(request):
+    """Готовность сервиса: доступны база данных и кэш."""
+    status = {}
+    try:
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        status['database'] = 'ok'
+    except DatabaseError as error:
+        status['database'] = str(error)
+    try:
+        cache.set(HEALTH_CACHE_KEY, 1, 10)
+        status['cache'] = 'ok' if cache.get(HEALTH_CACHE_KEY) else 'miss'
+    except Exception as error:
+        status['cache'] = str(error)
+    healthy = all(value == 'ok' for value in status.values())
+    return JsonResponse(status, status=200 if healthy else 503)
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+logger = logging.getLogger('foodgram.requests')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+METRICS = {
+    'foodgram_requests_total': (
+        'counter', 'Обработанные запросы'),
+    'foodgram_request_duration_seconds': (
+        'histogram', 'Время обработки запроса'),
+    'foodgram_db_queries_total': (
+        'counter', 'Запросы к базе данных'),
+    'foodgram_db_duration_seconds_total': (
+        'counter', 'Время выполнения запросов к базе данных'),
+    'foodgram_serializer_duration_seconds_total': (
+        'counter', 'Время сериализации ответов'),
+    'foodgram_response_bytes_total': (
+        'counter', 'Размер ответов'),
+    'foodgram_n_plus_one_total': (
+        'counter', 'Запросы с повторяющимся SQL (N+1)'),
+}
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+SPACES = re.compile(r'\s+')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def sql_shape(sql):
+    """SQL без различий в длине списков IN и пробелах."""
+    return SPACES.sub(' ', IN_LIST.sub('(%s)', sql)).strip()
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.shapes = Counter()
+        self.depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    @contextmanager
+    def serializer(self):
+        """Учесть время сериализации, вложенные вызовы не суммируются."""
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.serializer_time += time.perf_counter() - start
+
+    def repeated_queries(self):
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count > settings.N_PLUS_ONE_THRESHOLD
+        ]
+
+
+class Registry:
+    """Счётчики и гистограммы процесса в формате Prometheus."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [
+                    0] * (len(DURATION_BUCKETS) + 2)
+            for position, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[position] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @staticmethod
+    def format_labels(labels, **extra):
+        pairs = [*labels, *extra.items()]
+        return '{' + ','.join(
+            f'{key}="{value}"' for key, value in pairs
+        ) + '}' if pairs else ''
+
+    def render(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, list(value)) for key, value in self.histograms.items()
+            )
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f'{name}{self.format_labels(labels)} {value}')
+            for (metric, labels), values in histograms:
+                if metric != name:
+                    continue
+                for bound, count in zip(DURATION_BUCKETS, values):
+                    lines.append(
+                        f'{name}_bucket'
+                        f'{self.format_labels(labels, le=bound)} {count}'
+                    )
+                lines += [
+                    f'{name}_bucket'
+                    f'{self.format_labels(labels, le="+Inf")} {values[-1]}',
+                    f'{name}_sum{self.format_labels(labels)} {values[-2]}',
+                    f'{name}_count{self.format_labels(labels)} {values[-1]}',
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Учитывать запросы соединения в метриках текущего запроса.
+
+    Метрики находятся через contextvar, который asgiref передаёт
+    в потоки sync_to_async, поэтому учитываются запросы из любого потока.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def endpoint(request):
+    """Имя маршрута: ограниченный набор значений для метки."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    """Число и время запросов к БД, время сериализации и размер ответа.
+
+    Метрики отдаются заголовком Server-Timing, копятся для /metrics
+    и пишутся в лог foodgram.requests одной JSON-строкой.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    def record(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.start
+        size = None if response.streaming else len(response.content)
+        labels = (('endpoint', endpoint(request)),)
+        registry.inc('foodgram_requests_total', labels + (
+            ('method', request.method),
+            ('status', response.status_code),
+        ))
+        registry.observe('foodgram_request_duration_seconds', labels, duration)
+        registry.inc('foodgram_db_queries_total', labels, metrics.queries)
+        registry.inc(
+            'foodgram_db_duration_seconds_total', labels, metrics.db_time
+        )
+        registry.inc(
+            'foodgram_serializer_duration_seconds_total', labels,
+            metrics.serializer_time
+        )
+        if size is not None:
+            registry.inc('foodgram_response_bytes_total', labels, size)
+        repeated = metrics.repeated_queries()
+        if repeated:
+            registry.inc('foodgram_n_plus_one_total', labels)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        record = dict(
+            method=request.method,
+            path=request.path,
+            endpoint=labels[0][1],
+            status=response.status_code,
+            duration_ms=round(duration * 1000, 1),
+            queries=metrics.queries,
+            db_ms=round(metrics.db_time * 1000, 1),
+            serializer_ms=round(metrics.serializer_time * 1000, 1),
+            response_bytes=size,
+        )
+        if repeated:
+            record['repeated_queries'] = [
+                dict(sql=shape, count=count) for shape, count in repeated
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+_timed_serializers = {}
+
+
+def timed_serializer(serializer_class):
+    """Подкласс сериализатора, замеряющий время to_representation."""
+    timed = _timed_serializers.get(serializer_class)
+    if timed is None:
+        def to_representation(self, instance):
+            metrics = current_metrics.get()
+            if metrics is None:
+                return super(timed, self).to_representation(instance)
+            with metrics.serializer():
+                return super(timed, self).to_representation(instance)
+
+        timed = _timed_serializers[serializer_class] = type(
+            serializer_class.__name__, (serializer_class,), {
+                '__module__': serializer_class.__module__,
+                '__doc__': serializer_class.__doc__,
+                'to_representation': to_representation,
+            }
+        )
+    return timed
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,197 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, urlencode
+from foodgram.global_constants import (ANONYMOUS_CACHE_TIMEOUT,
+                                       CACHE_LOCK_TIMEOUT, CACHE_LOCK_WAIT,
+                                       REFERENCE_CACHE_TIMEOUT)
+from recipes.versions import get_version, get_versions
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import timed_serializer
+
+REFERENCE_CACHE_KEY = 'reference:{}:{}:{}'
+ANONYMOUS_CACHE_KEY = 'anonymous:{}'
+ANONYMOUS_LOCK_KEY = 'anonymous_lock:{}'
+
+
+def normalized_params(request):
+    """Параметры без пустых значений и page=1, в порядке ключей."""
+    params = []
+    for name in sorted(request.query_params):
+        values = sorted(
+            {value for value in request.query_params.getlist(name) if value}
+        )
+        if values and not (name == 'page' and values == ['1']):
+            params.append((name, values))
+    return urlencode(params, doseq=True)
+
+
+def request_key(request):
+    """Ключ фиксированной длины по хосту, пути и параметрам запроса."""
+    return hashlib.md5(
+        f'{request.get_host()}{request.path}?'
+        f'{normalized_params(request)}'.encode()
+    ).hexdigest()
+
+
+def not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in (
+            tag.strip() for tag in if_none_match.split(',')
+        ) or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(
+        request.headers.get('If-Modified-Since', '')
+    )
+    return (
+        if_modified_since is not None
+        and last_modified <= if_modified_since
+    )
+
+
+def content_response(request, etag, last_modified, content):
+    """Ответ из кэша: JSON или 304 по ETag и Last-Modified."""
+    if not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def cache_entry(data):
+    content = JSONRenderer().render(data)
+    return (
+        f'"{hashlib.sha256(content).hexdigest()}"',
+        int(time.time()),
+        content
+    )
+
+
+class CachedReferenceMixin:
+    """Кэш ответов справочников с ETag и Last-Modified.
+
+    Ответ хранится в общем кэше под ключом с версией набора данных
+    (cache_version), поэтому после изменения данных старые записи просто
+    перестают использоваться и истекают через REFERENCE_CACHE_TIMEOUT.
+    """
+
+    cache_version = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def cached_response(self, request, build, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return build(request, *args, **kwargs)
+        key = REFERENCE_CACHE_KEY.format(
+            self.cache_version, get_version(self.cache_version),
+            request_key(request)
+        )
+        entry = cache.get(key)
+        if entry is None:
+            response = build(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = cache_entry(response.data)
+            cache.set(key, entry, REFERENCE_CACHE_TIMEOUT)
+        return content_response(request, *entry)
+
+
+class AnonymousCacheMixin:
+    """Кэш ответов list и retrieve для анонимных пользователей.
+
+    Ключ строится по пути и нормализованным параметрам запроса. Запись
+    хранит версии данных, из которых собрана (cache_dependencies до
+    сборки и response_dependencies по её результату), и устаревает,
+    как только сменится любая из них. Пересобирает устаревшую запись
+    один запрос, остальные тем временем отдают старую или ждут новую.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.anonymous_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.anonymous_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def cache_dependencies(self, request):
+        return ()
+
+    def response_dependencies(self, data):
+        return ()
+
+    def anonymous_response(self, request, build, *args, **kwargs):
+        if (request.user.is_authenticated
+                or not isinstance(request.accepted_renderer, JSONRenderer)):
+            return build(request, *args, **kwargs)
+        key = ANONYMOUS_CACHE_KEY.format(request_key(request))
+        entry = cache.get(key)
+        if entry is None or not self.is_fresh(entry[0]):
+            entry = self.rebuild(key, entry, request, build, *args, **kwargs)
+            if not isinstance(entry, tuple):
+                return entry
+        response = content_response(request, *entry[1:])
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    @staticmethod
+    def is_fresh(versions):
+        return get_versions(list(versions)) == versions
+
+    def rebuild(self, key, stale, request, build, *args, **kwargs):
+        """Пересобрать запись под блокировкой от одновременной сборки."""
+        lock = ANONYMOUS_LOCK_KEY.format(key)
+        locked = cache.add(lock, 1, CACHE_LOCK_TIMEOUT)
+        if not locked:
+            if stale is not None:
+                return stale
+            deadline = time.monotonic() + CACHE_LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry
+        try:
+            versions = get_versions(self.cache_dependencies(request))
+            response = build(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            versions.update(
+                get_versions(self.response_dependencies(response.data))
+            )
+            entry = (versions, *cache_entry(response.data))
+            cache.set(key, entry, ANONYMOUS_CACHE_TIMEOUT)
+            return entry
+        finally:
+            if locked:
+                cache.delete(lock)
+
+
+class InstrumentedMixin:
+    """Сериализаторы вьюсета с замером времени для метрик запроса.
+
+    Сериализатор, отличный от get_serializer_class, передаётся
+    аргументом serializer_class.
+    """
+
+    def get_serializer(self, *args, serializer_class=None, **kwargs):
+        serializer_class = serializer_class or self.get_serializer_class()
+        kwargs.setdefault('context', self.get_serializer_context())
+        return timed_serializer(serializer_class)(*args, **kwargs)
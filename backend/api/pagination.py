@@ -1,5 +1,91 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from foodgram.global_constants import (COUNT_CACHE_THRESHOLD,
+                                       COUNT_CACHE_TIMEOUT, CURSOR_PAGE_SIZE,
+                                       MAX_PAGE_SIZE)
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CachedCountPaginator(Paginator):
+    """Большие COUNT(*) запоминаются на короткое время."""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        key = 'count:' + hashlib.md5(str(query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            if count >= COUNT_CACHE_THRESHOLD:
+                cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсор без OFFSET и COUNT; размер страницы берётся из limit."""
+    page_size = CURSOR_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def __init__(self, ordering=None):
+        if ordering:
+            self.ordering = ordering
+        self.count = None
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.count_query_param):
+            self.count = CachedCountPaginator(queryset, 1).count
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
+
+
+class FeedPagination(LimitCursorPagination):
+    """Лента рецептов: курсор по дате публикации."""
+    ordering = ('-pub_date', '-id')
+
+
+class CoveragePagination(PageNumberPagination):
+    """Постраничный вывод подбора рецептов по ингредиентам."""
+    page_size = CURSOR_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
 
 
 class PageLimitPagination(PageNumberPagination):
+    """Постраничный вывод page/limit с курсорным режимом по запросу.
+
+    Если у вьюсета задан cursor_ordering и в запросе есть параметр
+    cursor (для первой страницы - пустой), страницы отдаются курсором.
+    """
     page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        self.cursor = None
+        if ordering and self.cursor_query_param in request.query_params:
+            self.cursor = LimitCursorPagination(ordering)
+            return self.cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
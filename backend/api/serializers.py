@@ -1,13 +1,15 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db.models import F
+from django.db import transaction
 from djoser import serializers as ds
 from drf_extra_fields.fields import Base64ImageField
 from foodgram.global_constants import (MAX_AMOUNT_INGRIDIENTS,
                                        MAX_TIME_COOKING,
                                        MIN_AMOUNT_INGRIDIENTS,
                                        MIN_TIME_COOKING)
+from recipes.images import variant_name
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, Tag, TagInRecipe)
+from recipes.storage import ContentAddressedStorage
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 from users.models import Subscribe, User
@@ -30,6 +32,9 @@ class UserReadSerializer(ds.UserSerializer):
         )
 
     def get_is_subscribed(self, user):
+        subscriptions = self.context.get('subscriptions')
+        if subscriptions is not None:
+            return user.id in subscriptions
         request = self.context.get('request')
         return (request.user.is_authenticated and user.author.filter(
             user=request.user).exists())
@@ -67,10 +72,6 @@ class SubscribeSerializer(serializers.ModelSerializer):
 class SubscriptionSerializer(UserReadSerializer):
     """Сериализатор списка подписок."""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count',
-        read_only=True
-    )
 
     class Meta:
         model = User
@@ -80,11 +81,8 @@ class SubscriptionSerializer(UserReadSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        """Рецепты автора, выбранные заранее для всей страницы."""
+        recipes = self.context['recipes'].get(obj.id, [])
         return RecipeShortSerializer(recipes, many=True).data
 
 
@@ -108,13 +106,13 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Ингредиенты в рецепте. """
 
     id = serializers.ReadOnlyField(
-        source='ingredient.id'
+        source='ingredients.id'
     )
     name = serializers.ReadOnlyField(
-        source='ingredient.name'
+        source='ingredients.name'
     )
     measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit'
+        source='ingredients.measurement_unit'
     )
 
     class Meta:
@@ -122,49 +120,76 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeImageField(serializers.Field):
+    """Ссылка на вариант изображения нужного размера."""
+
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        variant = self.context.get('image_variant', self.variant)
+        url = recipe.image.storage.url(variant_name(recipe, variant))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Чтение рецептов. """
 
     tags = TagSerializer(many=True, read_only=True)
     author = UserReadSerializer(read_only=True)
-    # ingredients = IngredientInRecipeSerializer(
-    #     many=True,
-    #     source='recipe_ingredients'
-    # )
-    # нет, это тоже не помогло, может баг ловит
-    ingredients = serializers.SerializerMethodField(read_only=True)
-    is_favorited = serializers.SerializerMethodField(read_only=True)
-    is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
-    image = Base64ImageField(max_length=None, use_url=True, required=False)
-
-    def get_is_favorited(self, obj):
-        """Получить список избранного."""
-        request = self.context.get('request')
-        return (
-            request.user.is_authenticated
-            and obj.favorites.filter(
-                user=request.user).exists()
-        )
-
-    def get_is_in_shopping_cart(self, obj):
-        """Получить список покупок."""
-        request = self.context.get('request')
-        return (
-            request.user.is_authenticated
-            and obj.shopping_cart.filter(
-                user=request.user).exists()
-        )
+    ingredients = IngredientInRecipeSerializer(
+        many=True,
+        read_only=True,
+        source='recipe_ingredients'
+    )
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    image = RecipeImageField(variant='detail')
 
-    def get_ingredients(self, obj):
-        """Custom queryset: filter IngredientInRecipe by recipe."""
-        recipe = obj
-        ingredients = recipe.ingredients.values(
+    class Meta:
+        model = Recipe
+        fields = (
             'id',
+            'tags',
+            'author',
+            'ingredients',
+            'is_favorited',
+            'is_in_shopping_cart',
             'name',
-            'measurement_unit',
-            amount=F('recipe_ingredients__amount')
+            'image',
+            'text',
+            'cooking_time'
         )
-        return ingredients
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """Автор рецепта без отметки подписки зрителя."""
+
+    class Meta:
+        model = User
+        fields = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+class RecipeDocumentSerializer(serializers.ModelSerializer):
+    """Общая для всех зрителей часть рецепта.
+
+    Без отметок избранного, корзины и подписки, ссылка на изображение
+    относительная, поэтому результат можно кэшировать для всех.
+    """
+
+    tags = TagSerializer(many=True, read_only=True)
+    author = AuthorSerializer(read_only=True)
+    ingredients = IngredientInRecipeSerializer(
+        many=True,
+        read_only=True,
+        source='recipe_ingredients'
+    )
+    image = RecipeImageField(variant='detail')
 
     class Meta:
         model = Recipe
@@ -173,8 +198,6 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'tags',
             'author',
             'ingredients',
-            'is_favorited',
-            'is_in_shopping_cart',
             'name',
             'image',
             'text',
@@ -182,6 +205,19 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeCoverageSerializer(RecipeReadSerializer):
+    """Рецепт с долей имеющихся ингредиентов."""
+
+    coverage = serializers.FloatField(read_only=True)
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'coverage', 'matched', 'missing'
+        )
+
+
 class IngredientInRecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """Ингредиенты в рецепте """
     id = serializers.PrimaryKeyRelatedField(
@@ -262,30 +298,104 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         ]
         IngredientInRecipe.objects.bulk_create(ingredients_in_recipe)
 
+    @staticmethod
+    def update_tags(recipe, tags):
+        """Добавить новые и удалить снятые теги рецепта."""
+        current = set(TagInRecipe.objects.filter(recipe=recipe).values_list(
+            'tag_id', flat=True
+        ))
+        wanted = {tag.id for tag in tags}
+        if current - wanted:
+            TagInRecipe.objects.filter(
+                recipe=recipe, tag_id__in=current - wanted
+            ).delete()
+        TagInRecipe.objects.bulk_create(
+            TagInRecipe(recipe=recipe, tag_id=tag_id)
+            for tag_id in wanted - current
+        )
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Изменить только отличающиеся строки ингредиентов рецепта."""
+        current = {
+            item.ingredients_id: item
+            for item in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        wanted = {item['id'].id: item for item in ingredients}
+        removed = [
+            item.id for ingredient_id, item in current.items()
+            if ingredient_id not in wanted
+        ]
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = wanted.get(ingredient_id, {}).get('amount')
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        RecipeCreateUpdateSerializer.create_ingredients(
+            [item for ingredient_id, item in wanted.items()
+             if ingredient_id not in current],
+            recipe
+        )
+
+    @staticmethod
+    def is_same_image(image, current):
+        """Загружен тот же файл, что уже сохранён у рецепта.
+
+        Имя файла в хранилище - хэш содержимого, поэтому хватает
+        сравнить имена, не читая сохранённый файл.
+        """
+        if not current or not isinstance(
+            current.storage, ContentAddressedStorage
+        ):
+            return False
+        name = current.field.generate_filename(current.instance, image.name)
+        return current.storage.content_name(name, image) == current.name
+
+    @transaction.atomic
     def create(self, data):
         """Создать рецепт."""
         request = self.context.get('request')
         ingredients = data.pop('ingredients')
         tags = data.pop('tags')
         recipe = Recipe.objects.create(author=request.user, **data)
-        recipe.tags.set(tags)
+        TagInRecipe.objects.bulk_create(
+            TagInRecipe(recipe=recipe, tag=tag) for tag in tags
+        )
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, data):
-        """Обновить рецепт."""
-        tags = data.pop('tags')
-        ingredients = data.pop('ingredients')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients(recipe=instance, ingredients=ingredients)
+        """Обновить рецепт, меняя только изменившиеся связи."""
+        tags = data.pop('tags', None)
+        ingredients = data.pop('ingredients', None)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        image = data.get('image')
+        if image is not None and self.is_same_image(image, instance.image):
+            data.pop('image')
         return super().update(instance, data)
 
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
+        return RecipeReadSerializer(instance, context=self.context).data
+
 
 class RecipeShortSerializer(RecipeReadSerializer):
     """Короткая версия рецепта."""
 
+    image = RecipeImageField(variant='card')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -296,9 +406,11 @@ class ShoppingCartSerializer(RecipeShortSerializer):
 
     class Meta:
         model = ShoppingCart
-        fields = ('user', 'recipe')
+        fields = ('user', 'recipe', 'servings')
 
     def validate(self, data):
+        if self.instance is not None:
+            return data
         recipe = data['recipe']
         if ShoppingCart.objects.filter(
                 user=data['user'],
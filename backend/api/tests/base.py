@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework.test import APIClient, APITestCase
+from users.models import Subscribe, User
+
+
+class FoodgramTestCase(APITestCase):
+    """Пользователи, теги, ингредиенты и рецепты с отметками."""
+
+    recipes_count = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='password', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(3)
+        ]
+        cls.user = cls.users[0]
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        cls.recipes = []
+        for number in range(cls.recipes_count):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3], name=f'Рецепт {number}',
+                text='Описание', cooking_time=10
+            )
+            recipe.tags.set(cls.tags[:1 + number % 3])
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(
+                    recipe=recipe, ingredients=ingredient, amount=10
+                )
+                for ingredient in cls.ingredients[:1 + number % 5]
+            )
+            cls.recipes.append(recipe)
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in cls.users[1:]:
+            Subscribe.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.anonymous = APIClient()
@@ -0,0 +1,35 @@
+from users.models import User
+
+from .base import FoodgramTestCase
+
+
+class AnonymousCacheTest(FoodgramTestCase):
+
+    def test_unpaginated_list(self):
+        response = self.anonymous.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.recipes_count)
+        with self.assertNumQueries(0):
+            cached = self.anonymous.get('/api/recipes/')
+        self.assertEqual(cached.content, response.content)
+
+    def test_paginated_list_and_detail(self):
+        for url in ('/api/recipes/?limit=2',
+                    f'/api/recipes/{self.recipes[0].id}/'):
+            with self.subTest(url):
+                self.assertEqual(self.anonymous.get(url).status_code, 200)
+                with self.assertNumQueries(0):
+                    self.anonymous.get(url)
+
+    def test_author_change_invalidates_unpaginated_list(self):
+        self.anonymous.get('/api/recipes/')
+        author = User.objects.get(pk=self.users[1].pk)
+        author.first_name = 'Другое'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        names = {
+            recipe['author']['first_name']
+            for recipe in self.anonymous.get('/api/recipes/').json()
+            if recipe['author']['id'] == author.id
+        }
+        self.assertEqual(names, {'Другое'})
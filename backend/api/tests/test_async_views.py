@@ -0,0 +1,42 @@
+from unittest import mock
+
+from api.async_views import pooled, read_executor
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+
+def query(request, sql):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+    except DatabaseError:
+        return HttpResponse(status=500)
+    return HttpResponse()
+
+
+class PooledReadTest(SimpleTestCase):
+    """Поток пула проверяет соединение только после ошибки БД."""
+
+    databases = {'default'}
+
+    def setUp(self):
+        self.view = async_to_sync(pooled(query))
+        self.request = RequestFactory().get('/')
+
+    def tearDown(self):
+        read_executor.submit(connections.close_all).result()
+
+    def test_health_checked_only_after_database_error(self):
+        wrapper = type(connections['default'])
+        with mock.patch.object(
+            wrapper, 'is_usable', autospec=True, return_value=True
+        ) as is_usable:
+            for _ in range(3):
+                self.view(self.request, 'SELECT 1')
+            is_usable.assert_not_called()
+            self.view(self.request, 'SELECT * FROM missing_table')
+            self.view(self.request, 'SELECT 1')
+            self.view(self.request, 'SELECT 1')
+        self.assertEqual(is_usable.call_count, 1)
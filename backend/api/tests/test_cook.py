@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
+from recipes import coverage_index
+from recipes.models import IngredientInRecipe
+
+from .base import FoodgramTestCase
+
+URL = '/api/recipes/cook/'
+
+
+class CookTest(FoodgramTestCase):
+    """Подбор рецептов по имеющимся ингредиентам."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(coverage_index, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cook(self, ingredients, **params):
+        response = self.client.get(URL, {
+            'ingredients': ','.join(
+                str(ingredient.id) for ingredient in ingredients),
+            **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranking(self):
+        data = self.cook(self.ingredients[:2], limit=20)
+        self.assertEqual(data['count'], self.recipes_count)
+        # Сначала полное совпадение с большим числом ингредиентов, затем
+        # по убыванию доли; при равенстве - от новых рецептов к старым.
+        order = (6, 1, 5, 0, 7, 2, 8, 3, 9, 4)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']],
+            [self.recipes[number].id for number in order]
+        )
+        first, last = data['results'][0], data['results'][-1]
+        self.assertEqual(
+            (first['coverage'], first['matched'], first['missing']),
+            (1.0, 2, 0)
+        )
+        self.assertEqual(
+            (last['coverage'], last['matched'], last['missing']),
+            (0.4, 2, 3)
+        )
+
+    def test_invalid_ingredients(self):
+        for params in ({}, {'ingredients': 'соль'},
+                       {'ingredients': ','.join(['1'] * 31)}):
+            with self.subTest(params):
+                response = self.client.get(URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ingredients', response.json())
+
+    def test_ingredient_edit_is_applied_incrementally(self):
+        self.cook(self.ingredients[4:])
+        index = coverage_index._index
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.create(
+                recipe=self.recipes[0], ingredients=self.ingredients[4],
+                amount=10
+            )
+        with mock.patch.object(coverage_index, 'schedule_rebuild') as rebuild:
+            data = self.cook(self.ingredients[4:])
+        rebuild.assert_not_called()
+        self.assertIs(coverage_index._index, index)
+        self.assertEqual(
+            {recipe['id'] for recipe in data['results']},
+            {self.recipes[number].id for number in (0, 4, 9)}
+        )
+
+    def test_lost_journal_keeps_serving_old_index(self):
+        self.cook(self.ingredients[:1])
+        index = coverage_index._index
+        cache.delete(coverage_index.JOURNAL_KEY)
+        with mock.patch.object(coverage_index, 'schedule_rebuild') as rebuild:
+            data = self.cook(self.ingredients[:1])
+        rebuild.assert_called_once()
+        self.assertIs(coverage_index._index, index)
+        self.assertEqual(data['count'], self.recipes_count)
@@ -0,0 +1,46 @@
+from urllib.parse import parse_qs, urlparse
+
+from recipes.search import update_search_index
+
+from .base import FoodgramTestCase
+
+URL = '/api/recipes/'
+
+
+class CursorPaginationTest(FoodgramTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        update_search_index(recipe.id for recipe in cls.recipes)
+
+    def test_cursor_pages(self):
+        ids = []
+        url = f'{URL}?cursor=&limit=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn('count', data)
+            self.assertLessEqual(len(data['results']), 3)
+            ids += [recipe['id'] for recipe in data['results']]
+            url = data['next']
+            if url:
+                self.assertTrue(parse_qs(urlparse(url).query)['cursor'][0])
+        expected = sorted(
+            self.recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+            reverse=True
+        )
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_cursor_count(self):
+        data = self.client.get(URL, {'cursor': '', 'count': 1}).json()
+        self.assertEqual(data['count'], self.recipes_count)
+
+    def test_page_numbers_for_rankings_and_search(self):
+        for params in ({'ordering': 'popular'}, {'search': 'Рецепт'}):
+            with self.subTest(params):
+                data = self.client.get(
+                    URL, {'cursor': '', 'limit': 3, **params}).json()
+                self.assertEqual(data['count'], self.recipes_count)
+                self.assertEqual(len(data['results']), 3)
+                query = parse_qs(urlparse(data['next']).query)
+                self.assertEqual(query['page'], ['2'])
@@ -0,0 +1,41 @@
+from .base import FoodgramTestCase
+
+
+class QueryCountTest(FoodgramTestCase):
+    """Число запросов к БД не зависит от размера страницы (нет N+1)."""
+
+    def test_recipe_list(self):
+        # Страница, подписки зрителя, документы рецептов с тегами и
+        # ингредиентами, отметки избранного и корзины, count.
+        with self.assertNumQueries(7):
+            self.client.get('/api/recipes/?limit=2')
+        self.setUp()
+        with self.assertNumQueries(7):
+            response = self.client.get(
+                f'/api/recipes/?limit={self.recipes_count}'
+            )
+        self.assertEqual(len(response.data['results']), self.recipes_count)
+
+    def test_recipe_list_cached_documents(self):
+        self.client.get(f'/api/recipes/?limit={self.recipes_count}')
+        with self.assertNumQueries(4):
+            self.client.get(f'/api/recipes/?limit={self.recipes_count}')
+
+    def test_recipe_detail(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/recipes/{self.recipes[4].id}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+
+    def test_subscriptions(self):
+        for limit, recipes_limit in ((1, 1), (2, 3)):
+            with self.assertNumQueries(3):
+                self.client.get(
+                    f'/api/users/subscriptions/?limit={limit}'
+                    f'&recipes_limit={recipes_limit}'
+                )
+
+    def test_download_shopping_cart(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
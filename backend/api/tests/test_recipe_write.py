@@ -0,0 +1,88 @@
+from api.serializers import RecipeCreateUpdateSerializer
+from recipes.models import IngredientInRecipe
+from rest_framework.test import APIRequestFactory
+
+from .base import FoodgramTestCase
+
+
+class RecipeWriteQueriesTest(FoodgramTestCase):
+    """Создание и обновление рецепта пишут только изменившиеся связи."""
+
+    def serializer(self, payload, instance=None):
+        request = APIRequestFactory().post('/api/recipes/')
+        request.user = self.user
+        serializer = RecipeCreateUpdateSerializer(
+            instance, data=payload, context={'request': request},
+            partial=instance is not None
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def payload(self, tags, ingredients):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+        }
+
+    def create(self):
+        return self.serializer(self.payload(
+            self.tags[:2], [(ingredient, 10)
+                            for ingredient in self.ingredients[:3]]
+        )).save()
+
+    def rows(self, recipe):
+        return dict(IngredientInRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('ingredients_id', 'id'))
+
+    def test_create(self):
+        serializer = self.serializer(self.payload(
+            self.tags[:2], [(ingredient, 10)
+                            for ingredient in self.ingredients[:3]]
+        ))
+        # Рецепт, строка рейтинга, теги и ингредиенты пачками, savepoint.
+        with self.assertNumQueries(6):
+            recipe = serializer.save()
+        self.assertEqual(len(self.rows(recipe)), 3)
+
+    def test_update_without_changes(self):
+        recipe = self.create()
+        rows = self.rows(recipe)
+        serializer = self.serializer(self.payload(
+            self.tags[:2], [(ingredient, 10)
+                            for ingredient in self.ingredients[:3]]
+        ), recipe)
+        # Чтение текущих тегов и ингредиентов, сохранение рецепта;
+        # связи не пишутся.
+        with self.assertNumQueries(7):
+            serializer.save()
+        self.assertEqual(self.rows(recipe), rows)
+
+    def test_partial_update(self):
+        recipe = self.create()
+        rows = self.rows(recipe)
+        first, second, third, fourth = self.ingredients[:4]
+        serializer = self.serializer(self.payload(
+            self.tags[1:], [(first, 10), (second, 20), (fourth, 5)]
+        ), recipe)
+        # По одному запросу на снятый и новый тег, на удалённую, изменённую
+        # и добавленную строку ингредиентов.
+        with self.assertNumQueries(14):
+            serializer.save()
+        updated = self.rows(recipe)
+        self.assertEqual(updated[first.id], rows[first.id])
+        self.assertEqual(updated[second.id], rows[second.id])
+        self.assertNotIn(third.id, updated)
+        self.assertEqual(
+            set(recipe.tags.values_list('id', flat=True)),
+            {tag.id for tag in self.tags[1:]}
+        )
+        self.assertEqual(
+            IngredientInRecipe.objects.get(id=rows[second.id]).amount, 20
+        )
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import override_settings
+from recipes.checks import check_shared_cache
+from recipes.models import Tag
+from recipes.versions import TAGS_VERSION, VERSION_KEY, bump_version
+
+from .base import FoodgramTestCase
+
+
+class ReferenceCacheTest(FoodgramTestCase):
+
+    def test_bump_from_another_process_invalidates_response(self):
+        self.client.get('/api/tags/')
+        Tag.objects.bulk_create([
+            Tag(name='Новый', color='#000009', slug='new')
+        ])
+        # bulk_create не шлёт сигналов: так выглядит изменение из команды
+        # в другом процессе, которое видно только через общую версию.
+        self.assertEqual(len(self.client.get('/api/tags/').json()), 3)
+        bump_version(TAGS_VERSION)
+        response = self.client.get('/api/tags/')
+        self.assertEqual(len(response.json()), 4)
+
+    def test_entries_expire_and_keys_are_bounded(self):
+        self.client.get(f'/api/tags/?unknown={"x" * 2000}')
+        keys = [key for key in cache._cache if ':reference:' in key]
+        self.assertEqual(len(keys), 1)
+        self.assertLess(len(keys[0]), 100)
+        self.assertIsNotNone(cache._expire_info[keys[0]])
+
+    def test_process_local_versions_expire(self):
+        self.client.get('/api/tags/')
+        key = cache.make_key(VERSION_KEY.format(TAGS_VERSION))
+        self.assertIsNotNone(cache._expire_info[key])
+
+    def test_process_local_cache_warning(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['recipes.W001']
+        )
+        with override_settings(
+            CACHE_BACKEND='django.core.cache.backends.memcached.'
+                          'PyMemcacheCache'
+        ):
+            self.assertEqual(check_shared_cache(None), [])
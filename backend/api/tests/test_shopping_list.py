@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+from django.core.cache import cache
+from recipes.models import ShoppingCart
+from recipes.shopping_cart import CACHE_KEY, aggregate
+
+from .base import FoodgramTestCase
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class AggregateTest(FoodgramTestCase):
+
+    def test_single_unit_is_kept(self):
+        rows = [
+            (1, 'Суп', 2, 'Соль', 'ч. л.'),
+            (2, 'Каша', 1, 'Соль', 'ч. л.'),
+        ]
+        self.assertEqual(aggregate(rows), [dict(
+            name='Соль', amount=4, measurement_unit='ч. л.',
+            recipes=['Каша', 'Суп']
+        )])
+
+    def test_units_are_merged(self):
+        rows = [
+            (1, 'Суп', 500, 'Мука', 'г'),
+            (2, 'Каша', 1, 'Мука', 'кг'),
+            (1, 'Суп', 1, 'Масло', 'ст. л.'),
+            (1, 'Каша', 2, 'Масло', 'ч. л.'),
+            (1, 'Суп', 2, 'Яйцо', 'шт.'),
+            (1, 'Суп', None, None, None),
+        ]
+        self.assertEqual(aggregate(rows), [
+            dict(name='Масло', amount=25, measurement_unit='мл',
+                 recipes=['Каша', 'Суп']),
+            dict(name='Мука', amount=2.5, measurement_unit='кг',
+                 recipes=['Каша', 'Суп']),
+            dict(name='Яйцо', amount=2, measurement_unit='шт.',
+                 recipes=['Суп']),
+        ])
+
+
+class ShoppingListExportTest(FoodgramTestCase):
+
+    def download(self, file_type):
+        response = self.client.get(URL, {'file_type': file_type})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'.{file_type}', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_txt(self):
+        lines = self.download('txt').splitlines()
+        self.assertEqual(lines[0], 'Список покупок:')
+        self.assertEqual(
+            lines[2],
+            'Ингредиент 0, 50 г '
+            '(Рецепт 0, Рецепт 2, Рецепт 4, Рецепт 6, Рецепт 8)'
+        )
+        self.assertEqual(lines[-1], 'Ингредиент 4, 10 г (Рецепт 4)')
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.download('csv'))))
+        self.assertEqual(
+            rows[0], ['name', 'amount', 'measurement_unit', 'recipes'])
+        self.assertEqual(
+            rows[2],
+            ['Ингредиент 1', '40', 'г',
+             'Рецепт 2; Рецепт 4; Рецепт 6; Рецепт 8']
+        )
+        self.assertEqual(len(rows), 6)
+
+    def test_json(self):
+        ingredients = json.loads(self.download('json'))
+        self.assertEqual(
+            [(item['name'], item['amount']) for item in ingredients],
+            [(f'Ингредиент {number}', 50 - 10 * number)
+             for number in range(5)]
+        )
+
+    def test_unknown_file_type(self):
+        response = self.client.get(URL, {'file_type': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cache_is_dropped_after_commit(self):
+        self.download('json')
+        key = CACHE_KEY.format(self.user.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            ShoppingCart.objects.filter(
+                user=self.user, recipe=self.recipes[0]).update(servings=3)
+            ShoppingCart.objects.get(
+                user=self.user, recipe=self.recipes[2]).delete()
+            self.assertIsNotNone(cache.get(key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(key))
+        ingredients = json.loads(self.download('json'))
+        self.assertEqual(ingredients[0]['amount'], 60)
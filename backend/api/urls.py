@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .health import health
 from .views import (FoodgramUserViewSet, IngredientViewSet, RecipeViewSet,
                     TagViewSet)
 
@@ -17,4 +18,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('', include('djoser.urls.base')),
     path('auth/', include('djoser.urls.authtoken')),
+    path('health/', health, name='health'),
 ]
@@ -1,98 +1,294 @@
-from datetime import datetime
+from collections import defaultdict
 
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+from foodgram.global_constants import (CURSOR_PAGE_SIZE,
+                                       INGREDIENT_SEARCH_LIMIT,
+                                       MAX_COVERAGE_INGREDIENTS,
+                                       RECOMMENDATION_NEIGHBORS)
+from recipes.coverage_index import get_coverage_index
+from recipes.ingredient_index import get_ingredient_index
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.rankings import RANKINGS
+from recipes.recommendations import recommended_recipes, similar_recipes
+from recipes.shopping_cart import get_shopping_list
+from recipes.versions import (AUTHOR_RECIPES_VERSION, AUTHOR_VERSION,
+                              INGREDIENTS_VERSION, RANKINGS_VERSION,
+                              RECIPE_VERSION, RECIPES_VERSION, TAGS_VERSION)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Subscribe, User
 
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import PageLimitPagination
+from .documents import PersonalizedRecipeSerializer
+from .exporters import EXPORTERS, export_shopping_list
+from .filters import RecipeFilter
+from .mixins import (AnonymousCacheMixin, CachedReferenceMixin,
+                     InstrumentedMixin)
+from .pagination import CoveragePagination, FeedPagination, PageLimitPagination
 from .permissions import IsAuthorOrAdminOrReadOnly
 from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeCreateUpdateSerializer, RecipeReadSerializer,
-                          ShoppingCartSerializer, SubscribeSerializer,
-                          SubscriptionSerializer, TagSerializer,
-                          UserReadSerializer)
+                          RecipeCoverageSerializer,
+                          RecipeCreateUpdateSerializer, ShoppingCartSerializer,
+                          SubscribeSerializer, SubscriptionSerializer,
+                          TagSerializer, UserReadSerializer)
 
+PERSONALIZED_ACTIONS = ('list', 'retrieve', 'similar', 'recommended')
+CARD_ACTIONS = ('list', 'cook', 'similar', 'recommended')
 
-class RecipeViewSet(viewsets.ModelViewSet):
+RELATION_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'cart_count',
+}
+
+
+class RecipeViewSet(AnonymousCacheMixin, InstrumentedMixin,
+                    viewsets.ModelViewSet):
     """Кастомный вьюсет рецептов модели Recipe."""
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrAdminOrReadOnly]
     filterset_class = RecipeFilter
     pagination_class = PageLimitPagination
 
-    def get_serializer_class(self):
+    @property
+    def cursor_ordering(self):
+        """Курсор только по дате.
+
+        Рейтинги и поиск с сортировкой по релевантности листаются
+        номерами страниц.
+        """
+        params = self.request.query_params
+        if params.get('ordering') in RANKINGS or params.get('search'):
+            return None
+        return ('-pub_date', '-id')
+
+    def get_queryset(self):
         if self.action in ('list', 'retrieve'):
-            return RecipeReadSerializer
+            return Recipe.objects.only('id', 'author_id', 'pub_date')
+        return Recipe.objects.all()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in CARD_ACTIONS:
+            context['image_variant'] = 'card'
+        user = self.request.user
+        if (self.action in (*PERSONALIZED_ACTIONS, 'cook')
+                and user.is_authenticated):
+            context['subscriptions'] = set(
+                Subscribe.objects.filter(user=user).values_list(
+                    'author_id', flat=True
+                )
+            )
+        return context
+
+    def cache_dependencies(self, request):
+        """Версии данных, от которых зависит ответ анониму.
+
+        Рецепт зависит от своей версии, список автора - от версии его
+        рецептов, остальные списки - от любого изменения рецептов.
+        Профили авторов на странице добавляет response_dependencies.
+        """
+        if self.action == 'retrieve':
+            recipes = RECIPE_VERSION.format(self.kwargs['pk'])
+        elif request.query_params.get('author', '').isdigit():
+            recipes = AUTHOR_RECIPES_VERSION.format(
+                request.query_params['author']
+            )
+        else:
+            recipes = RECIPES_VERSION
+        if request.query_params.get('ordering') in RANKINGS:
+            return (recipes, RANKINGS_VERSION, TAGS_VERSION,
+                    INGREDIENTS_VERSION)
+        return (recipes, TAGS_VERSION, INGREDIENTS_VERSION)
+
+    def response_dependencies(self, data):
+        """Версии авторов рецептов ответа.
+
+        Ответ - страница, список без пагинации или один рецепт.
+        """
+        if isinstance(data, list):
+            recipes = data
+        elif 'results' in data:
+            recipes = data['results']
+        else:
+            recipes = [data]
+        return {
+            AUTHOR_VERSION.format(recipe['author']['id'])
+            for recipe in recipes
+        }
+
+    def get_serializer_class(self):
+        if self.action == 'cook':
+            return RecipeCoverageSerializer
+        if self.action in PERSONALIZED_ACTIONS:
+            return PersonalizedRecipeSerializer
         return RecipeCreateUpdateSerializer
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            User.objects.filter(pk=self.request.user.pk).update(
+                recipes_count=F('recipes_count') + 1
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            User.objects.filter(
+                pk=instance.author_id, recipes_count__gt=0
+            ).update(
+                recipes_count=F('recipes_count') - 1
+            )
+
     @staticmethod
-    def create_relation(request, pk, serializer):
+    def create_relation(request, pk, serializer, **extra):
         recipe = get_object_or_404(Recipe, pk=pk)
         data = {
             'user': request.user.id,
-            'recipe': recipe.id
+            'recipe': recipe.id,
+            **extra
         }
 
         context = {'request': request}
+        counter = RELATION_COUNTERS[serializer.Meta.model]
         serializer = serializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            Recipe.objects.filter(pk=recipe.pk).update(
+                **{counter: F(counter) + 1}
+            )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def delete_relation(request, pk, model):
-        get_object_or_404(
-            model, user=request.user, recipe=get_object_or_404(
-                Recipe, pk=pk)
-        ).delete()
+        counter = RELATION_COUNTERS[model]
+        recipe = get_object_or_404(Recipe, pk=pk)
+        with transaction.atomic():
+            get_object_or_404(model, user=request.user, recipe=recipe).delete()
+            Recipe.objects.filter(
+                pk=recipe.pk, **{f'{counter}__gt': 0}
+            ).update(
+                **{counter: F(counter) - 1}
+            )
         message = {
             'detail':
                 'Данные удалены.'
         }
         return Response(message, status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated]
+    )
+    def download_shopping_cart(self, request):
+        """Скачать список покупок."""
+        file_type = request.query_params.get('file_type', 'txt')
+        if file_type not in EXPORTERS:
+            return Response(
+                {'file_type': f'Доступные форматы: {", ".join(EXPORTERS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return export_shopping_list(
+            get_shopping_list(request.user), file_type
+        )
+
     @staticmethod
-    def export_file(ingredients):
-        data = []
-        for ingredient in ingredients:
-            data.append(
-                f'{ingredient["name"]}, '
-                f'{ingredient["amount"]} '
-                f'{ingredient["measurement_unit"]}'
+    def get_ingredient_ids(request):
+        values = [
+            value
+            for param in request.query_params.getlist('ingredients')
+            for value in param.split(',') if value.strip()
+        ]
+        if not values:
+            raise ValidationError(
+                {'ingredients': 'Укажите id имеющихся ингредиентов.'}
+            )
+        if len(values) > MAX_COVERAGE_INGREDIENTS:
+            raise ValidationError({
+                'ingredients':
+                    f'Не более {MAX_COVERAGE_INGREDIENTS} ингредиентов.'
+            })
+        try:
+            return [int(value) for value in values]
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'id ингредиентов должны быть числами.'}
             )
-        content = 'Список покупок:\n\n' + '\n'.join(data)
-        date = datetime.today()
-        filename = f'{date}_shopping_list.txt'
-        request = HttpResponse(content, content_type='text/plain')
-        request['Content-Disposition'] = f'attachment; filename={filename}'
-        return request
 
     @action(
         detail=False,
         methods=['GET'],
-        permission_classes=[IsAuthorOrAdminOrReadOnly]
+        pagination_class=CoveragePagination
     )
-    def download_shopping_cart(self, request):
-        """Скачать список покупок."""
-        user = request.user
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_cart__user=user).values(
-            name=F('ingredients__name'),
-            measurement_unit=F('ingredients__measurement_unit')).order_by(
-            'ingredients__name').annotate(
-            amount=Sum('amount')
+    def cook(self, request):
+        """Рецепты, для которых хватает больше всего имеющихся продуктов."""
+        results = get_coverage_index().search(
+            self.get_ingredient_ids(request)
         )
-        return RecipeViewSet.export_file(ingredients)
+        page = self.paginate_queryset(results)
+        recipes = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).in_bulk([item['id'] for item in page])
+        found = []
+        for item in page:
+            recipe = recipes.get(item['id'])
+            if recipe is not None:
+                vars(recipe).update(item)
+                found.append(recipe)
+        serializer = self.get_serializer(found, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_recommendations_limit(request):
+        limit = request.query_params.get('limit')
+        if limit is None:
+            return CURSOR_PAGE_SIZE
+        if not limit.isdigit() or not 1 <= int(limit) <= (
+                RECOMMENDATION_NEIGHBORS):
+            raise ValidationError({
+                'limit': 'Укажите целое число от 1 до '
+                         f'{RECOMMENDATION_NEIGHBORS}.'
+            })
+        return int(limit)
+
+    def recipes_response(self, recipe_ids):
+        """Рецепты в порядке recipe_ids, удалённые пропускаются."""
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'pub_date'
+        ).in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=['GET']
+    )
+    def similar(self, request, pk):
+        """Похожие рецепты из посчитанных build_recommendations."""
+        recipe = get_object_or_404(Recipe, pk=pk)
+        return self.recipes_response(similar_recipes(
+            recipe.id, self.get_recommendations_limit(request)
+        ))
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated]
+    )
+    def recommended(self, request):
+        """Рецепты, похожие на избранное и покупки пользователя."""
+        return self.recipes_response(recommended_recipes(
+            request.user, self.get_recommendations_limit(request)
+        ))
 
     @action(
         detail=True,
@@ -101,12 +297,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk):
         """Список покупок."""
+        extra = {}
+        if 'servings' in request.data:
+            extra['servings'] = request.data['servings']
         return RecipeViewSet.create_relation(
             request,
             pk,
-            ShoppingCartSerializer
+            ShoppingCartSerializer,
+            **extra
         )
 
+    @shopping_cart.mapping.patch
+    def update_shopping_cart(self, request, pk):
+        """Изменить множитель порций рецепта в корзине."""
+        cart = get_object_or_404(ShoppingCart, user=request.user, recipe=pk)
+        serializer = ShoppingCartSerializer(
+            cart,
+            data={'servings': request.data.get('servings')},
+            partial=True,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         return RecipeViewSet.delete_relation(request, pk, ShoppingCart)
@@ -129,47 +343,109 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeViewSet.delete_relation(request, pk, Favorite)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReferenceMixin, InstrumentedMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Стандартный ридонли вьюсет тегов модели Tag."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny, ]
+    cache_version = TAGS_VERSION
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReferenceMixin, InstrumentedMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Стандартный ридонли вьюсет ингридиентов модели Ingredient."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
     permission_classes = [AllowAny, ]
+    cache_version = INGREDIENTS_VERSION
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по началу и части названия через индекс в памяти."""
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        ingredients = get_ingredient_index().search(
+            name, INGREDIENT_SEARCH_LIMIT
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
-class FoodgramUserViewSet(UserViewSet):
+
+class FoodgramUserViewSet(InstrumentedMixin, UserViewSet):
     """Кастомный ViewSet модели User."""
     queryset = User.objects.all()
     permission_classes = [AllowAny, ]
     filter_backends = [DjangoFilterBackend]
     pagination_class = PageLimitPagination
+    cursor_ordering = ('username', 'id')
     serializer_class = UserReadSerializer
 
+    @staticmethod
+    def get_recipes_limit(request):
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return None
+        if not recipes_limit.isdigit() or int(recipes_limit) < 1:
+            raise ValidationError(
+                {'recipes_limit': 'Укажите целое положительное число.'}
+            )
+        return int(recipes_limit)
+
     @action(
         detail=False,
         methods=['GET', ],
-        permission_classes=[IsAuthorOrAdminOrReadOnly]
+        permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
         """Список подписок."""
         user = request.user
+        recipes_limit = self.get_recipes_limit(request)
         subscriptions = User.objects.filter(
             author__user=user
         )
         page = self.paginate_queryset(subscriptions)
-        serializer = SubscriptionSerializer(
-            page, many=True, context={'request': request}
+        authors = [author.id for author in page]
+        recipes = Recipe.objects.filter(author_id__in=authors)
+        if recipes_limit:
+            recipes = recipes.latest_per_author(recipes_limit)
+        author_recipes = defaultdict(list)
+        for recipe in recipes:
+            author_recipes[recipe.author_id].append(recipe)
+        serializer = self.get_serializer(
+            page, many=True, serializer_class=SubscriptionSerializer,
+            context={
+                'request': request,
+                'recipes': author_recipes,
+                'subscriptions': set(authors)
+            }
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        methods=['GET', ],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """Свежие рецепты авторов из подписок."""
+        recipes = Recipe.objects.filter(
+            author_id__in=Subscribe.objects.filter(
+                user=request.user
+            ).values('author_id')
+        ).only('id', 'author_id', 'pub_date')
+        paginator = FeedPagination()
+        page = paginator.paginate_queryset(recipes, request, view=self)
+        serializer = self.get_serializer(
+            page, many=True, serializer_class=PersonalizedRecipeSerializer,
+            context={
+                'request': request,
+                'image_variant': 'card',
+                'subscriptions': {recipe.author_id for recipe in page}
+            }
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=['POST'],
@@ -185,14 +461,24 @@ class FoodgramUserViewSet(UserViewSet):
         }
         serializer = SubscribeSerializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            User.objects.filter(pk=author.pk).update(
+                subscribers_count=F('subscribers_count') + 1
+            )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id):
         author = get_object_or_404(User, id=id)
         user = request.user
-        get_object_or_404(Subscribe, user=user, author=author).delete()
+        with transaction.atomic():
+            get_object_or_404(Subscribe, user=user, author=author).delete()
+            User.objects.filter(
+                pk=author.pk, subscribers_count__gt=0
+            ).update(
+                subscribers_count=F('subscribers_count') - 1
+            )
         message = {
             'detail': f'Вы отписались от пользователя {author}'
         }
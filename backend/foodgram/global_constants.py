@@ -25,3 +25,35 @@ MAX_TIME_COOKING = 32767
 MIN_AMOUNT_INGRIDIENTS = 1
 
 MAX_AMOUNT_INGRIDIENTS = 32767
+
+MAX_SERVINGS = 20
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+CURSOR_PAGE_SIZE = 6
+
+MAX_PAGE_SIZE = 100
+
+COUNT_CACHE_THRESHOLD = 1000
+
+COUNT_CACHE_TIMEOUT = 60
+
+MAX_COVERAGE_INGREDIENTS = 30
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+ANONYMOUS_CACHE_TIMEOUT = 60 * 60 * 24
+
+CACHE_LOCK_TIMEOUT = 10
+
+CACHE_LOCK_WAIT = 1
+
+DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+TRENDING_HALF_LIFE_DAYS = 3
+
+RECOMMENDATION_NEIGHBORS = 20
+
+RECOMMENDATION_HISTORY = 50
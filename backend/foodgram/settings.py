@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -32,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
+    'api.async_views.AsyncReadPathMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,7 +73,7 @@ if TEST_VERSION_SQLITE:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
-
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
         }
     }
 else:
@@ -82,9 +85,40 @@ else:
             "PASSWORD": os.getenv("POSTGRES_PASSWORD", default='1234'),
             "HOST": os.getenv("DB_HOST", default='localhost'),
             "PORT": os.getenv("DB_PORT", default='5432'),
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
         }
     }
 
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+ASYNC_URLCONF = os.getenv('ASYNC_URLCONF', 'foodgram.asgi_urls')
+
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', 8))
+
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Версии данных меняют команды и другие процессы. Кэш в памяти процесса
+# этих изменений не видит, поэтому версии в нём истекают через
+# CACHE_VERSION_TIMEOUT секунд; в общем кэше (memcached) они бессрочны.
+CACHE_VERSION_TIMEOUT = (
+    int(os.getenv('CACHE_VERSION_TIMEOUT', 60))
+    if CACHE_BACKEND in PROCESS_LOCAL_CACHES else None
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -148,6 +182,36 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+IMAGE_PIPELINE_SYNC = os.getenv('IMAGE_PIPELINE_SYNC', 'False') == 'True'
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
+
+# Журнал запросов foodgram.requests: по умолчанию только предупреждения
+# (N+1 и повторяющиеся запросы), REQUEST_LOG_LEVEL=INFO пишет каждый
+# запрос. В тестах журнал отключён.
+TESTING = sys.argv[1:2] == ['test']
+
+REQUEST_LOG_LEVEL = (
+    'CRITICAL' if TESTING else os.getenv('REQUEST_LOG_LEVEL', 'WARNING')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': REQUEST_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -2,7 +2,9 @@ from django.contrib import admin
 from django.contrib.auth.models import Group
 from django.utils.safestring import mark_safe
 
-from .models import Ingredient, IngredientInRecipe, Recipe, Tag
+from .images import variant_name
+from .models import Ingredient, IngredientInRecipe, Recipe, Tag, TagInRecipe
+from .search import search_recipes
 
 
 class IngredientInRecipeInLine(admin.StackedInline):
@@ -12,44 +14,56 @@ class IngredientInRecipeInLine(admin.StackedInline):
     autocomplete_fields = ('ingredients',)
 
 
+class TagInRecipeInLine(admin.TabularInline):
+    model = TagInRecipe
+    extra = 1
+    min_num = 1
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
 
-    @admin.display(description='В избранном')
-    def favorited_count(self):
-        return self.favorites.count()
-
     @admin.display(description="Ингредиенты")
     def ingredient_in_recipe(self):
         return (', '.join(map(str, self.recipe_ingredients.all())))
 
     @admin.display(description="Изображения")
     def image(self, obj):
-        return mark_safe(f'<img src={obj.image.url} width="80" height="60">')
+        if not obj.image:
+            return None
+        url = obj.image.storage.url(variant_name(obj, 'thumb'))
+        return mark_safe(f'<img src={url} width="80" height="60">')
 
     list_display = (
         'id',
         'author',
         'name',
         'pub_date',
-        favorited_count,
+        'image',
+        'favorites_count',
+        'cart_count',
         ingredient_in_recipe
     )
+    list_select_related = ('author',)
     list_display_links = (
         'author',
         'name',
     )
-    search_fields = (
-        'name',
-        'text',
-        'tags',
-        'author',
-        'tags'
-    )
+    search_fields = ('name',)
 
-    inlines = (IngredientInRecipeInLine,)
+    inlines = (TagInRecipeInLine, IngredientInRecipeInLine)
     empty_value_display = '-пусто-'
-    readonly_fields = ('pub_date',)
+    readonly_fields = ('pub_date', 'favorites_count', 'cart_count')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'recipe_ingredients__ingredients'
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_recipes(queryset, search_term), False
 
 
 @admin.register(Tag)
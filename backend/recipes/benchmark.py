@@ -0,0 +1,280 @@
+import io
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from users.models import Subscribe, User
+
+from .coverage_index import reset_journal
+from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCart, Tag, TagInRecipe)
+from .rankings import refresh_rankings
+from .search import update_search_index
+from .versions import RECIPES_VERSION, bump_version
+
+BENCH_PREFIX = 'bench'
+VIEWER = f'{BENCH_PREFIX}_viewer'
+BATCH_SIZE = 2000
+HISTORY_DAYS = 90
+DISHES = (
+    'по-домашнему', 'запечённый', 'тушёный', 'с травами', 'на гриле',
+    'по-деревенски', 'с сыром', 'в горшочке', 'фаршированный', 'жареный',
+)
+
+
+def popularity(count, exponent=1.1):
+    """Накопленные веса распределения Ципфа для random.choices."""
+    total, weights = 0, []
+    for rank in range(count):
+        total += 1 / (rank + 1) ** exponent
+        weights.append(total)
+    return weights
+
+
+def fan_out(rng, minimum, maximum, alpha=1.2):
+    """Число связей со степенным распределением (Парето)."""
+    return min(maximum, int(minimum * rng.paretovariate(alpha)))
+
+
+def pick(rng, items, weights, count):
+    """До count разных элементов с учётом популярности."""
+    picked = dict.fromkeys(rng.choices(items, cum_weights=weights, k=count))
+    return list(picked)[:count]
+
+
+def text_generator(rng):
+    """Faker из dev-зависимостей, если установлен."""
+    try:
+        from faker import Faker
+    except ImportError:
+        return None
+    fake = Faker('ru_RU')
+    fake.seed_instance(rng.random())
+    return fake
+
+
+def seed(recipes_count, authors_count, users_count=0, random_seed=None,
+         batch_size=BATCH_SIZE):
+    """Сгенерировать данные для замеров и вернуть пользователя-зрителя.
+
+    Авторы, теги и ингредиенты выбираются по закону Ципфа, число
+    подписок, избранного и покупок у пользователя - по Парето, поэтому
+    есть несколько очень популярных авторов и рецептов и длинный хвост.
+    Одинаковый random_seed даёт одинаковые данные.
+    """
+    rng = random.Random(random_seed)
+    fake = text_generator(rng)
+    readers_count = max(users_count - authors_count, 0)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{BENCH_PREFIX}{number}',
+                email=f'{BENCH_PREFIX}{number}@example.com',
+                first_name=fake.first_name() if fake else BENCH_PREFIX,
+                last_name=fake.last_name() if fake else BENCH_PREFIX
+            ) for number in range(authors_count + readers_count)
+        ] + [
+            User(username=VIEWER, email=f'{VIEWER}@example.com',
+                 first_name=BENCH_PREFIX, last_name=BENCH_PREFIX)
+        ],
+        batch_size=batch_size
+    )
+    viewer = User.objects.get(username=VIEWER)
+    users = list(User.objects.filter(
+        username__startswith=BENCH_PREFIX
+    ).exclude(pk=viewer.pk).order_by('id'))
+    authors = users[:authors_count]
+    author_weights = popularity(len(authors))
+
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create(
+            Tag(name=f'{BENCH_PREFIX}{number}', color=f'#00000{number}',
+                slug=f'{BENCH_PREFIX}{number}')
+            for number in range(5)
+        )
+    tags = list(Tag.objects.order_by('id'))
+    rng.shuffle(tags)
+    tag_weights = popularity(len(tags))
+    if not Ingredient.objects.exists():
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'{BENCH_PREFIX}{number}', measurement_unit='г')
+            for number in range(500)
+        )
+    ingredients = list(Ingredient.objects.order_by('id'))
+    rng.shuffle(ingredients)
+    ingredient_weights = popularity(len(ingredients))
+
+    plans, recipes = [], []
+    for author in rng.choices(authors, cum_weights=author_weights,
+                              k=recipes_count):
+        recipe_ingredients = pick(
+            rng, ingredients, ingredient_weights, rng.randint(3, 12)
+        )
+        plans.append((
+            pick(rng, tags, tag_weights, rng.randint(1, 3)),
+            recipe_ingredients
+        ))
+        main = recipe_ingredients[-1].name
+        recipes.append(Recipe(
+            author=author,
+            name=f'{main} {rng.choice(DISHES)}'[:155],
+            text=fake.paragraph(5) if fake else ', '.join(
+                ingredient.name for ingredient in recipe_ingredients
+            ),
+            cooking_time=rng.randint(5, 180)
+        ))
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+    recipe_ids = list(Recipe.objects.filter(
+        author__in=authors
+    ).order_by('id').values_list('id', flat=True))
+    TagInRecipe.objects.bulk_create(
+        (
+            TagInRecipe(recipe_id=recipe_id, tag=tag)
+            for recipe_id, (recipe_tags, _) in zip(recipe_ids, plans)
+            for tag in recipe_tags
+        ),
+        batch_size=batch_size
+    )
+    IngredientInRecipe.objects.bulk_create(
+        (
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredients=ingredient,
+                amount=rng.randint(1, 500)
+            )
+            for recipe_id, (_, recipe_ingredients) in zip(recipe_ids, plans)
+            for ingredient in recipe_ingredients
+        ),
+        batch_size=batch_size
+    )
+
+    Subscribe.objects.bulk_create(
+        [
+            Subscribe(user=user, author=author)
+            for user in users
+            for author in pick(
+                rng, authors, author_weights,
+                fan_out(rng, 1, len(authors))
+            )
+            if author != user
+        ] + [Subscribe(user=viewer, author=author) for author in authors[::2]],
+        batch_size=batch_size, ignore_conflicts=True
+    )
+    popular_recipes = rng.sample(recipe_ids, len(recipe_ids))
+    recipe_weights = popularity(len(popular_recipes))
+    now = timezone.now()
+    peaks = {
+        recipe_id: rng.uniform(0, HISTORY_DAYS) for recipe_id in recipe_ids
+    }
+
+    def added(recipe_id):
+        """Дата добавления вокруг пика интереса к рецепту."""
+        days = min(abs(rng.gauss(peaks[recipe_id], 7)), HISTORY_DAYS)
+        return now - timedelta(days=days)
+
+    for model, maximum in ((Favorite, 200), (ShoppingCart, 10)):
+        model.objects.bulk_create(
+            (
+                model(user=user, recipe_id=recipe_id, added=added(recipe_id))
+                for user in users
+                for recipe_id in pick(
+                    rng, popular_recipes, recipe_weights,
+                    fan_out(rng, 1, maximum)
+                )
+            ),
+            batch_size=batch_size, ignore_conflicts=True
+        )
+        model.objects.bulk_create(
+            (
+                model(user=viewer, recipe_id=recipe_id)
+                for recipe_id in rng.sample(
+                    recipe_ids, min(len(recipe_ids), 20)
+                )
+            ),
+            ignore_conflicts=True
+        )
+
+    call_command('recount', stdout=io.StringIO())
+    for offset in range(0, len(recipe_ids), batch_size):
+        update_search_index(recipe_ids[offset:offset + batch_size])
+    refresh_rankings(batch_size=batch_size)
+    reset_journal()
+    bump_version(RECIPES_VERSION)
+    return viewer
+
+
+def scenarios(limit=6):
+    """Горячие эндпоинты: (название, URL) на сгенерированных данных."""
+    slugs = '&'.join(
+        f'tags={slug}'
+        for slug in Tag.objects.values_list('slug', flat=True)[:3]
+    )
+    author_id = Recipe.objects.values_list(
+        'author_id', flat=True
+    ).order_by('-author__recipes_count').first()
+    recipe = Recipe.objects.order_by('-favorites_count').first()
+    ingredient_ids = list(IngredientInRecipe.objects.filter(
+        recipe=recipe
+    ).values_list('ingredients_id', flat=True)[:5])
+    prefix = Ingredient.objects.get(pk=ingredient_ids[0]).name[:3]
+    word = recipe.name.split()[0]
+    return (
+        ('recipe list', f'/api/recipes/?limit={limit}'),
+        ('recipes by 3 tags', f'/api/recipes/?limit={limit}&{slugs}'),
+        ('recipes by author',
+         f'/api/recipes/?limit={limit}&author={author_id}'),
+        ('favorited recipes', f'/api/recipes/?limit={limit}&is_favorited=1'),
+        ('recipe search', f'/api/recipes/?limit={limit}&search={word}'),
+        ('recipe retrieve', f'/api/recipes/{recipe.id}/'),
+        ('similar recipes', f'/api/recipes/{recipe.id}/similar/'),
+        ('recommended recipes', f'/api/recipes/recommended/?limit={limit}'),
+        ('what can I cook', f'/api/recipes/cook/?limit={limit}&ingredients='
+                            + ','.join(map(str, ingredient_ids))),
+        ('subscriptions',
+         f'/api/users/subscriptions/?limit={limit}&recipes_limit=3'),
+        ('download shopping cart', '/api/recipes/download_shopping_cart/'),
+        ('ingredient search', f'/api/ingredients/?name={prefix}'),
+    )
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(client, url, repeat, warmup=1):
+    """Задержки (мс) и число SQL-запросов одного эндпоинта."""
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return dict(
+        url=url,
+        status=response.status_code,
+        queries=len(queries),
+        p50=round(statistics.median(timings), 2),
+        p95=round(percentile(timings, 0.95), 2),
+        p99=round(percentile(timings, 0.99), 2),
+        mean=round(statistics.mean(timings), 2),
+        min=round(timings[0], 2),
+        max=round(timings[-1], 2),
+    )
+
+
+def dataset_size():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Recipe, IngredientInRecipe, Subscribe,
+                      Favorite, ShoppingCart)
+    }
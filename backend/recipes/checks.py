@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии данных должны быть общими для команд и веб-процессов."""
+    if settings.CACHE_BACKEND not in settings.PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш хранится в памяти процесса: изменения из команд '
+        'load_data, load_tags, recount и refresh_rankings дойдут до '
+        'веб-процессов только через CACHE_VERSION_TIMEOUT секунд.',
+        hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION, '
+             'например memcached.',
+        id='recipes.W001',
+    )]
@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .models import IngredientInRecipe
+
+JOURNAL_KEY = 'recipe_ingredients_journal'
+CHANGE_KEY = 'recipe_ingredients_change:{}'
+CHANGE_TIMEOUT = 60 * 60
+MAX_CHANGES = 1000
+
+logger = logging.getLogger(__name__)
+
+_index = None
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def bitset(slots):
+    """Целое число с единицами в битах slots."""
+    if not slots:
+        return 0
+    bits = bytearray(max(slots) // 8 + 1)
+    for slot in slots:
+        bits[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+class CoverageIndex:
+    """Обратный индекс ингредиент -> рецепты для подбора по продуктам.
+
+    Каждому рецепту выделен бит (слот), рецепты ингредиента и рецепты
+    с одинаковым числом ингредиентов хранятся битовыми множествами.
+    Число совпадений считается побитовым сложением множеств выбранных
+    ингредиентов, поэтому запрос не перебирает рецепты по одному.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.built = time.monotonic()
+        self.slots = {}
+        self.recipe_ids = []
+        self.recipe_ingredients = {}
+        postings = defaultdict(list)
+        sizes = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            if recipe_id not in self.slots:
+                self.slots[recipe_id] = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+                self.recipe_ingredients[recipe_id] = set()
+            self.recipe_ingredients[recipe_id].add(ingredient_id)
+        for recipe_id, ingredients in self.recipe_ingredients.items():
+            slot = self.slots[recipe_id]
+            sizes[len(ingredients)].append(slot)
+            for ingredient_id in ingredients:
+                postings[ingredient_id].append(slot)
+            self.recipe_ingredients[recipe_id] = tuple(ingredients)
+        self.postings = {key: bitset(value) for key, value in postings.items()}
+        self.sizes = {key: bitset(value) for key, value in sizes.items()}
+
+    def refresh(self, recipe_ids, rows):
+        """Заменить состав рецептов recipe_ids на rows."""
+        ingredients = {recipe_id: set() for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id, new in ingredients.items():
+            old = set(self.recipe_ingredients.get(recipe_id, ()))
+            if old == new:
+                continue
+            slot = self.slots.get(recipe_id)
+            if slot is None:
+                slot = self.slots[recipe_id] = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+            bit = 1 << slot
+            for ingredient_id in old - new:
+                self.postings[ingredient_id] &= ~bit
+            for ingredient_id in new - old:
+                self.postings[ingredient_id] = (
+                    self.postings.get(ingredient_id, 0) | bit
+                )
+            if old:
+                self.sizes[len(old)] &= ~bit
+            if new:
+                self.sizes[len(new)] = self.sizes.get(len(new), 0) | bit
+            self.recipe_ingredients[recipe_id] = tuple(new)
+
+    def search(self, ingredient_ids):
+        """Подбор рецептов по имеющимся ингредиентам.
+
+        Возвращает CoverageResults: рецепты, где есть хотя бы один
+        из ингредиентов, по убыванию доли совпадений, затем по числу
+        недостающих и совпавших ингредиентов и от новых к старым.
+        """
+        planes = []
+        matched = 0
+        for ingredient_id in set(ingredient_ids):
+            carry = self.postings.get(ingredient_id, 0)
+            matched |= carry
+            for position, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[position], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        counts = {}
+        for count in range(1, 2 ** len(planes)):
+            bits = matched
+            for position, plane in enumerate(planes):
+                bits &= plane if count >> position & 1 else ~plane
+            if bits:
+                counts[count] = bits
+        groups = []
+        for size, recipes in list(self.sizes.items()):
+            for count, bits in counts.items():
+                if count <= size and bits & recipes:
+                    groups.append(
+                        (count / size, size - count, count, bits & recipes)
+                    )
+        groups.sort(key=lambda group: (-group[0], group[1], -group[2]))
+        return CoverageResults(self, groups)
+
+
+class CoverageResults:
+    """Ленивая последовательность результатов для постраничного вывода."""
+
+    def __init__(self, index, groups):
+        self.recipe_ids = index.recipe_ids
+        self.groups = groups
+        self.total = sum(popcount(group[3]) for group in groups)
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop, _ = key.indices(self.total)
+        found = []
+        for coverage, missing, count, bits in self.groups:
+            size = popcount(bits)
+            if start >= size:
+                start -= size
+                stop -= size
+                continue
+            position = 0
+            while bits and position < stop:
+                slot = bits.bit_length() - 1
+                bits ^= 1 << slot
+                if position >= start:
+                    found.append(dict(
+                        id=self.recipe_ids[slot],
+                        coverage=coverage,
+                        matched=count,
+                        missing=missing
+                    ))
+                position += 1
+            start, stop = 0, stop - size
+            if stop <= 0:
+                break
+        return found
+
+
+def load_rows(recipe_ids=None):
+    rows = IngredientInRecipe.objects.order_by('recipe_id')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    return rows.values_list('recipe_id', 'ingredients_id').iterator()
+
+
+def journal_position():
+    """Номер последней записи в журнале изменений состава рецептов.
+
+    Счётчик хранится без срока жизни, чтобы номера шли подряд. Если ключ
+    вытеснен из кэша, отсчёт начинается заново от текущего времени,
+    и по разрыву в номерах индексы перестраиваются.
+    """
+    position = cache.get(JOURNAL_KEY)
+    if position is None:
+        cache.add(JOURNAL_KEY, time.time_ns(), None)
+        position = cache.get(JOURNAL_KEY)
+    return position
+
+
+def recipe_changed(recipe_id):
+    """Отметить изменение состава рецепта для индексов всех процессов."""
+    try:
+        position = cache.incr(JOURNAL_KEY)
+    except ValueError:
+        journal_position()
+        return
+    cache.set(CHANGE_KEY.format(position), recipe_id, CHANGE_TIMEOUT)
+
+
+def reset_journal():
+    """Перестроить индексы всех процессов, например после массовой загрузки."""
+    cache.delete(JOURNAL_KEY)
+
+
+def rebuild():
+    global _index, _rebuilding
+    close_old_connections()
+    try:
+        index = CoverageIndex(load_rows(), journal_position())
+        with _lock:
+            _index = index
+    except Exception:
+        logger.exception('Не удалось перестроить индекс подбора рецептов')
+    finally:
+        _rebuilding = False
+        close_old_connections()
+
+
+def schedule_rebuild():
+    """Перестроить индекс в фоне; до этого запросы видят прежний."""
+    global _rebuilding
+    if _rebuilding:
+        return
+    _rebuilding = True
+    threading.Thread(
+        target=rebuild, name='coverage-index', daemon=True
+    ).start()
+
+
+def is_expired(index):
+    """Индекс из кэша процесса не видит изменений других процессов."""
+    timeout = settings.CACHE_VERSION_TIMEOUT
+    return timeout is not None and time.monotonic() - index.built > timeout
+
+
+def get_coverage_index():
+    """Актуальный индекс с изменениями из журнала.
+
+    Первый индекс строится в запросе. Если журнал неполон или индекс
+    устарел, новый строится в фоне, а запросы пока обслуживает прежний.
+    """
+    global _index
+    position = journal_position()
+    with _lock:
+        if _index is None:
+            _index = CoverageIndex(load_rows(), position)
+        elif _index.version != position:
+            positions = range(_index.version + 1, position + 1)
+            changes = cache.get_many(
+                [CHANGE_KEY.format(number) for number in positions]
+            ) if 0 < len(positions) <= MAX_CHANGES else {}
+            if positions and len(changes) == len(positions):
+                recipe_ids = set(changes.values())
+                _index.refresh(recipe_ids, load_rows(recipe_ids))
+                _index.version = position
+            else:
+                schedule_rebuild()
+        if is_expired(_index):
+            schedule_rebuild()
+        return _index
@@ -0,0 +1,128 @@
+import io
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, features
+
+from .models import Recipe
+from .versions import (AUTHOR_RECIPES_VERSION, RECIPE_VERSION, RECIPES_VERSION,
+                       bump_versions)
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumb': (160, 120),
+    'card': (480, 320),
+    'detail': (1200, 800),
+}
+SOURCE = 'source'
+
+if features.check('webp'):
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'WEBP', 'webp'
+else:
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'JPEG', 'jpg'
+
+
+def render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, IMAGE_FORMAT, quality=85)
+    return buffer.getvalue()
+
+
+def build_variants(recipe_id):
+    """Подготовить уменьшенные копии изображения рецепта.
+
+    Хранилище называет файлы по хэшу содержимого, поэтому их можно
+    кэшировать навсегда. Если варианты уже собраны из текущего
+    изображения и файлы на месте, ничего не перекодируется.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants', 'author_id'
+    ).first()
+    if recipe is None or not recipe.image:
+        return None
+    storage = recipe.image.storage
+    current = recipe.image_variants or {}
+    if current.get(SOURCE) == recipe.image.name and all(
+        current.get(name) and storage.exists(current[name])
+        for name in VARIANTS
+    ):
+        return current
+    with recipe.image.open('rb') as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    if IMAGE_FORMAT == 'JPEG':
+        image = image.convert('RGB')
+    variants = {SOURCE: recipe.image.name}
+    for name, size in VARIANTS.items():
+        variants[name] = storage.save(
+            f'recipes/variants/{name}.{IMAGE_EXTENSION}',
+            ContentFile(render_variant(image, size))
+        )
+    if Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        image_variants=variants
+    ):
+        bump_versions((
+            RECIPES_VERSION, RECIPE_VERSION.format(recipe_id),
+            AUTHOR_RECIPES_VERSION.format(recipe.author_id)
+        ))
+    return variants
+
+
+class ImageQueue:
+    """Очередь обработки изображений с одним фоновым потоком."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def put(self, recipe_id):
+        if settings.IMAGE_PIPELINE_SYNC:
+            self.process(recipe_id)
+            return
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name='recipe-images', daemon=True
+                )
+                self.worker.start()
+        self.queue.put(recipe_id)
+
+    def run(self):
+        while True:
+            recipe_id = self.queue.get()
+            close_old_connections()
+            try:
+                self.process(recipe_id)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    @staticmethod
+    def process(recipe_id):
+        try:
+            build_variants(recipe_id)
+        except Exception:
+            logger.exception(
+                'Не удалось обработать изображение рецепта %s', recipe_id
+            )
+
+
+image_queue = ImageQueue()
+
+
+def variant_name(recipe, variant):
+    """Имя файла варианта или исходного изображения, пока вариант не готов."""
+    variants = recipe.image_variants or {}
+    if variant and variants.get(SOURCE) == recipe.image.name:
+        return variants.get(variant) or recipe.image.name
+    return recipe.image.name
@@ -0,0 +1,74 @@
+import threading
+from bisect import bisect_left
+
+from .models import Ingredient
+from .versions import INGREDIENTS_VERSION, get_version
+
+TRIGRAM_SIZE = 3
+
+_index = None
+_lock = threading.Lock()
+
+
+def trigrams(text):
+    return {
+        text[position:position + TRIGRAM_SIZE]
+        for position in range(len(text) - TRIGRAM_SIZE + 1)
+    }
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов для автодополнения.
+
+    Отсортированный список названий отвечает на поиск по префиксу
+    бинарным поиском, триграммный индекс - на поиск по подстроке.
+    """
+
+    def __init__(self, ingredients, version=None):
+        self.version = version
+        self.ingredients = sorted(
+            ingredients, key=lambda item: (item.name.lower(), item.id)
+        )
+        self.names = [item.name.lower() for item in self.ingredients]
+        self.trigrams = {}
+        for position, name in enumerate(self.names):
+            for trigram in trigrams(name):
+                self.trigrams.setdefault(trigram, []).append(position)
+
+    def search(self, query, limit):
+        """Точные совпадения, затем начало названия, затем подстрока."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + '\uffff', start)
+        found = list(range(start, min(end, start + limit)))
+        if len(found) < limit and len(query) >= TRIGRAM_SIZE:
+            found.extend(self._substring(query, limit - len(found)))
+        return [self.ingredients[position] for position in found]
+
+    def _substring(self, query, limit):
+        postings = [
+            self.trigrams.get(trigram, ()) for trigram in trigrams(query)
+        ]
+        matches = []
+        for position in min(postings, key=len):
+            if self.names[position].find(query) > 0:
+                matches.append(position)
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+def get_ingredient_index():
+    """Индекс актуальной версии, перестраивается после изменений."""
+    global _index
+    version = get_version(INGREDIENTS_VERSION)
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.only('id', 'name', 'measurement_unit'),
+                    version
+                )
+    return _index
@@ -0,0 +1,189 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from .models import Ingredient, Tag
+from .versions import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+
+BATCH_SIZE = 500
+READ_SIZE = 64 * 1024
+
+
+def iter_json(file):
+    """Объекты JSON-массива или JSON Lines без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = file.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_csv(file, fields):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+class BulkLoader:
+    """Пакетная загрузка справочника с обновлением существующих записей.
+
+    Записи сравниваются по key_fields; новые добавляются bulk_create,
+    у найденных обновляются update_fields через bulk_update.
+    """
+
+    model = None
+    key_fields = ()
+    update_fields = ()
+    csv_fields = ()
+    version = None
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.stats = dict(rows=0, inserted=0, updated=0, skipped=0)
+        self.elapsed = 0
+
+    def read(self, path):
+        with open(path, encoding='utf-8') as file:
+            if Path(path).suffix == '.csv':
+                yield from iter_csv(file, self.csv_fields)
+            else:
+                yield from iter_json(file)
+
+    def load(self, rows):
+        start = time.perf_counter()
+        rows = iter(rows)
+        with transaction.atomic():
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.load_batch(batch)
+            if self.dry_run:
+                transaction.set_rollback(True)
+        if not self.dry_run and (self.stats['inserted']
+                                 or self.stats['updated']):
+            bump_version(self.version)
+        self.elapsed = time.perf_counter() - start
+        return self.stats
+
+    def key(self, values):
+        return tuple(values[field] for field in self.key_fields)
+
+    def clean(self, row):
+        fields = self.key_fields + self.update_fields
+        if any(not str(row.get(field) or '').strip() for field in fields):
+            return None
+        return {field: str(row[field]).strip() for field in fields}
+
+    def load_batch(self, batch):
+        self.stats['rows'] += len(batch)
+        rows = {}
+        for row in map(self.clean, batch):
+            if row is None or self.key(row) in rows:
+                self.stats['skipped'] += 1
+                continue
+            rows[self.key(row)] = row
+        lookup = {
+            f'{self.key_fields[0]}__in': {key[0] for key in rows}
+        }
+        existing = {
+            self.key(vars(obj)): obj
+            for obj in self.model.objects.filter(**lookup)
+        }
+        created, changed = [], []
+        for key, row in rows.items():
+            obj = existing.get(key)
+            if obj is None:
+                created.append(self.model(**row))
+            elif any(getattr(obj, field) != row[field]
+                     for field in self.update_fields):
+                for field in self.update_fields:
+                    setattr(obj, field, row[field])
+                changed.append(obj)
+            else:
+                self.stats['skipped'] += 1
+        if created:
+            # ignore_conflicts молча отбрасывает строки, нарушившие другие
+            # уникальные поля, поэтому добавленные считаются по таблице.
+            before = self.model.objects.count()
+            self.model.objects.bulk_create(created, ignore_conflicts=True)
+            inserted = self.model.objects.count() - before
+            self.stats['inserted'] += inserted
+            self.stats['skipped'] += len(created) - inserted
+        if changed:
+            self.model.objects.bulk_update(changed, self.update_fields)
+        self.stats['updated'] += len(changed)
+
+    def summary(self):
+        rate = self.stats['rows'] / self.elapsed if self.elapsed else 0
+        return (
+            f'Строк: {self.stats["rows"]}, '
+            f'добавлено: {self.stats["inserted"]}, '
+            f'обновлено: {self.stats["updated"]}, '
+            f'пропущено: {self.stats["skipped"]}, '
+            f'{rate:.0f} строк/с'
+            + (' (пробный запуск, изменения отменены)'
+               if self.dry_run else '')
+        )
+
+
+class IngredientLoader(BulkLoader):
+    model = Ingredient
+    key_fields = ('name', 'measurement_unit')
+    csv_fields = ('name', 'measurement_unit')
+    version = INGREDIENTS_VERSION
+
+
+class TagLoader(BulkLoader):
+    model = Tag
+    key_fields = ('slug',)
+    update_fields = ('name', 'color')
+    csv_fields = ('name', 'color', 'slug')
+    version = TAGS_VERSION
+
+
+class LoadCommand(BaseCommand):
+    """Общая команда загрузки справочника из JSON или CSV."""
+
+    loader_class = None
+    default_path = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=self.default_path)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        loader = self.loader_class(
+            batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        try:
+            loader.load(loader.read(options['path']))
+        except (OSError, ValueError) as error:
+            raise CommandError(
+                f'Ошибка загрузки {options["path"]}: {error}'
+            )
+        self.stdout.write(loader.summary())
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import platform
+import statistics
+import time
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.utils import timezone
+from recipes.benchmark import VIEWER, dataset_size, percentile
+from recipes.models import Recipe
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+PATHS = ('sync', 'async')
+
+
+def read_urls(limit):
+    """GET-эндпоинты, которые обслуживает асинхронный путь."""
+    recipe = Recipe.objects.order_by('-favorites_count').first()
+    return (
+        f'/api/recipes/?limit={limit}',
+        f'/api/recipes/{recipe.id}/',
+        '/api/tags/',
+        f'/api/ingredients/?name={recipe.name[:2]}',
+    )
+
+
+def delayed(latency):
+    """Обёртка запросов с задержкой сетевого обмена с сервером БД."""
+    def execute(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.insert(0, execute)
+
+    return install
+
+
+async def request(application, url, headers):
+    """Один запрос к ASGI-приложению без сети."""
+    path, _, query = url.partition('?')
+    scope = dict(
+        type='http', asgi={'version': '3.0'}, http_version='1.1',
+        method='GET', scheme='http', path=path, raw_path=path.encode(),
+        query_string=query.encode(), root_path='', headers=headers,
+        client=('127.0.0.1', 0), server=('localhost', 80),
+    )
+    status = None
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+async def load(application, urls, headers, concurrency, total):
+    """total запросов по кругу из urls, не больше concurrency сразу."""
+    timings, errors = [], 0
+    queue = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for number in queue:
+            start = time.perf_counter()
+            status = await request(
+                application, urls[number % len(urls)], headers
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += status != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    return dict(
+        concurrency=concurrency,
+        requests=total,
+        errors=errors,
+        rps=round(total / elapsed, 1),
+        p50=round(statistics.median(timings), 2),
+        p95=round(percentile(timings, 0.95), 2),
+        p99=round(percentile(timings, 0.99), 2),
+    )
+
+
+class Command(BaseCommand):
+    help = ('Load the ASGI application with concurrent GET requests and '
+            'compare the sync and the pooled async read paths')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 8, 32]
+        )
+        parser.add_argument(
+            '--requests', type=int, default=400,
+            help='Запросов на каждый уровень параллельности'
+        )
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument(
+            '--path', choices=PATHS, nargs='+', default=list(PATHS)
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Задержка каждого SQL-запроса в мс: локальная SQLite '
+                 'не ждёт сеть, как PostgreSQL на другом хосте'
+        )
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        viewer = User.objects.filter(username=VIEWER).first()
+        if viewer is None:
+            raise CommandError('Сначала выполните seed_bench')
+        token, _ = Token.objects.get_or_create(user=viewer)
+        headers = [
+            (b'host', b'localhost'),
+            (b'authorization', f'Token {token.key}'.encode()),
+        ]
+        urls = read_urls(options['limit'])
+        # Потоки пула сами открывают соединения; соединение команды
+        # не должно держать блокировку или транзакцию.
+        connection.close()
+        install = delayed(options['db_latency'] / 1000)
+        if options['db_latency']:
+            connection_created.connect(install)
+        results = {}
+        try:
+            for path in options['path']:
+                results[path] = asyncio.run(
+                    self.run_path(path, urls, headers, options)
+                )
+        finally:
+            connection_created.disconnect(install)
+        if options['output']:
+            report = dict(
+                created=timezone.now().isoformat(),
+                database=connection.vendor,
+                python=platform.python_version(),
+                urls=urls,
+                db_latency=options['db_latency'],
+                dataset=dataset_size(),
+                results=results,
+            )
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    async def run_path(self, path, urls, headers, options):
+        async_urlconf = 'foodgram.asgi_urls' if path == 'async' else None
+        results = []
+        with override_settings(ASYNC_URLCONF=async_urlconf):
+            application = get_asgi_application()
+            await load(application, urls, headers, 1, len(urls))
+            for concurrency in options['concurrency']:
+                result = await load(
+                    application, urls, headers, concurrency,
+                    options['requests']
+                )
+                results.append(result)
+                self.report(path, result)
+        return results
+
+    def report(self, path, result):
+        if result['errors']:
+            self.stderr.write(f'{path}: ошибок {result["errors"]}')
+        self.stdout.write(
+            f'{path} x{result["concurrency"]}: {result["rps"]:.0f} req/s '
+            f'p50={result["p50"]:.1f}ms p95={result["p95"]:.1f}ms '
+            f'p99={result["p99"]:.1f}ms'
+        )
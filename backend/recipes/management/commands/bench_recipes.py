@@ -0,0 +1,96 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+from recipes.benchmark import (BENCH_PREFIX, VIEWER, dataset_size, measure,
+                               scenarios, seed)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Measure latency percentiles and query counts of the main '
+            'endpoints, optionally writing JSON to compare between runs')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Замерять на данных seed_bench вместо временных'
+        )
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['existing']:
+                viewer = User.objects.filter(username=VIEWER).first()
+                if viewer is None:
+                    raise CommandError('Сначала выполните seed_bench')
+            else:
+                if User.objects.filter(
+                    username__startswith=BENCH_PREFIX
+                ).exists():
+                    raise CommandError(
+                        'Есть данные seed_bench: используйте --existing'
+                    )
+                viewer = seed(
+                    options['recipes'], options['authors'],
+                    options['users'], random_seed=options['seed']
+                )
+            token, _ = Token.objects.get_or_create(user=viewer)
+            client = Client(
+                SERVER_NAME='localhost',
+                HTTP_AUTHORIZATION=f'Token {token.key}'
+            )
+            results = {}
+            for name, url in scenarios(options['limit']):
+                results[name] = measure(client, url, options['repeat'])
+                self.report(name, results[name])
+            report = dict(
+                created=timezone.now().isoformat(),
+                database=connection.vendor,
+                python=platform.python_version(),
+                repeat=options['repeat'],
+                dataset=dataset_size(),
+                results=results,
+            )
+            transaction.set_rollback(True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def report(self, name, result):
+        if result['status'] != 200:
+            self.stderr.write(f'{name}: HTTP {result["status"]}')
+        self.stdout.write(
+            f'{name}: p50={result["p50"]:.1f}ms p95={result["p95"]:.1f}ms '
+            f'p99={result["p99"]:.1f}ms queries={result["queries"]}'
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = (result['p50'] / before['p50'] - 1) * 100
+            self.stdout.write(
+                f'{name}: p50 {before["p50"]:.1f} -> {result["p50"]:.1f}ms '
+                f'({change:+.0f}%), queries {before["queries"]} -> '
+                f'{result["queries"]}'
+            )
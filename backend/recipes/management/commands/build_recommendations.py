@@ -0,0 +1,60 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from foodgram.global_constants import RECOMMENDATION_NEIGHBORS
+from recipes.neighbors import (build_neighbors, load_dataset, save_neighbors,
+                               synthetic_dataset)
+
+
+class Command(BaseCommand):
+    help = ('Build top-k similar recipes from favorites and carts '
+            'co-occurrence and ingredient/tag overlap, reporting time and '
+            'memory')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors', type=int, default=RECOMMENDATION_NEIGHBORS
+        )
+        parser.add_argument(
+            '--synthetic', type=int, nargs=2,
+            metavar=('RECIPES', 'FAVORITES'),
+            help='Замерить построение на сгенерированных данных без базы'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        tracemalloc.start()
+        start = time.perf_counter()
+        if options['synthetic']:
+            dataset = synthetic_dataset(*options['synthetic'], options['seed'])
+        else:
+            dataset = load_dataset()
+        recipe_ids, interactions, ingredients, tags = dataset
+        loaded = time.perf_counter()
+        self.stdout.write(
+            f'Данные: рецептов {len(recipe_ids)}, взаимодействий '
+            f'{len(interactions[0])}, ингредиентов в рецептах '
+            f'{len(ingredients[0])} за {loaded - start:.1f} с'
+        )
+        rows, cols, scores = build_neighbors(
+            len(recipe_ids), interactions, ingredients, tags,
+            options['neighbors']
+        )
+        built = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Соседей: {len(rows)} за {built - loaded:.1f} с, пик памяти '
+            f'{peak / 2 ** 20:.0f} МБ, max RSS '
+            f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}'
+            ' МБ'
+        )
+        if options['synthetic']:
+            return
+        saved = save_neighbors(recipe_ids, rows, cols, scores)
+        self.stdout.write(
+            f'Сохранено рецептов: {saved} за '
+            f'{time.perf_counter() - built:.1f} с'
+        )
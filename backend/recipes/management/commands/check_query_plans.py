@@ -0,0 +1,150 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from recipes.benchmark import BENCH_PREFIX, VIEWER, seed
+from recipes.models import (Favorite, IngredientInRecipe, Recipe, ShoppingCart,
+                            Tag, TagInRecipe)
+from recipes.rankings import order_by_ranking
+from recipes.shopping_cart import shopping_list_queryset
+from users.models import Subscribe, User
+
+HOT_TABLES = {
+    model._meta.db_table for model in (
+        Recipe, Favorite, ShoppingCart, IngredientInRecipe, TagInRecipe,
+        Subscribe
+    )
+}
+PAGE = 6
+MAX_SORT_ROWS = 10000
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?! USING)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT = re.compile(r'\bSort\s+\(cost=[\d.]+ rows=(\d+)')
+
+
+def hot_queries(viewer):
+    """Запросы горячих эндпоинтов: (название, SQL, параметры, сортировка).
+
+    Последний флаг разрешает сортировку на SQLite, где план не сообщает
+    число строк: это выборки, ограниченные данными одного пользователя.
+    """
+    authors = list(User.objects.filter(author__user=viewer).values_list(
+        'id', flat=True
+    )[:PAGE])
+    tag_ids = list(Tag.objects.values_list('id', flat=True)[:3])
+    querysets = (
+        ('recipe list', Recipe.objects.with_user_flags(viewer)[:PAGE],
+         False),
+        ('recipes by author', Recipe.objects.filter(
+            author_id=authors[0])[:PAGE], False),
+        ('recipes by tags', Recipe.objects.filter(Exists(
+            TagInRecipe.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=tag_ids)
+        ))[:PAGE], False),
+        ('popular recipes', order_by_ranking(
+            Recipe.objects.all(), 'popular')[:PAGE], False),
+        ('trending recipes by tags', order_by_ranking(
+            Recipe.objects.filter(Exists(TagInRecipe.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=tag_ids
+            ))), 'trending')[:PAGE], False),
+        ('is_favorited filter', Recipe.objects.filter(
+            favorites__user=viewer)[:PAGE], True),
+        ('is_in_shopping_cart filter', Recipe.objects.filter(
+            shopping_cart__user=viewer)[:PAGE], True),
+        ('download_shopping_cart', shopping_list_queryset(viewer), True),
+        ('subscriptions', User.objects.filter(
+            author__user=viewer)[:PAGE], True),
+        ('feed', Recipe.objects.filter(
+            author_id__in=Subscribe.objects.filter(
+                user=viewer).values('author_id')
+        ).order_by('-pub_date', '-id')[:PAGE], True),
+    )
+    for name, queryset, allow_sort in querysets:
+        yield (name, *queryset.query.sql_with_params(), allow_sort)
+    ranked = Recipe.objects.filter(author_id__in=authors).latest_per_author(3)
+    yield 'subscription recipes', ranked.raw_query, ranked.params, True
+
+
+def explain(sql, params):
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(
+            ' '.join(map(str, row)) for row in cursor.fetchall()
+        )
+
+
+def plan_problems(plan, allow_sort):
+    if connection.vendor == 'postgresql':
+        problems = [
+            f'seq scan on {table}' for table in POSTGRES_SCAN.findall(plan)
+            if table in HOT_TABLES
+        ]
+        problems += [
+            f'sort of ~{rows} rows' for rows in POSTGRES_SORT.findall(plan)
+            if int(rows) > MAX_SORT_ROWS
+        ]
+        return problems
+    problems = [
+        f'full scan of {table}' for table in SQLITE_SCAN.findall(plan)
+        if table in HOT_TABLES or re.fullmatch(r'U\d+', table)
+    ]
+    if not allow_sort and 'USE TEMP B-TREE' in plan:
+        problems.append('temporary b-tree sort')
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Check query plans of hot endpoints on generated data '
+            '(rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--authors', type=int, default=500)
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Проверять на данных seed_bench вместо временных'
+        )
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['existing']:
+                viewer = User.objects.filter(username=VIEWER).first()
+                if viewer is None:
+                    raise CommandError('Сначала выполните seed_bench')
+            else:
+                if User.objects.filter(
+                    username__startswith=BENCH_PREFIX
+                ).exists():
+                    raise CommandError(
+                        'Есть данные seed_bench: используйте --existing'
+                    )
+                viewer = seed(options['recipes'], options['authors'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            failures = self.check_plans(viewer, options['verbose_plans'])
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                f'Неэффективные планы запросов: {", ".join(failures)}'
+            )
+
+    def check_plans(self, viewer, verbose):
+        failures = []
+        for name, sql, params, allow_sort in hot_queries(viewer):
+            plan = explain(sql, params)
+            problems = plan_problems(plan, allow_sort)
+            status = 'FAIL' if problems else 'ok'
+            self.stdout.write(
+                f'{status:4} {name}' + (
+                    f': {", ".join(problems)}' if problems else ''
+                )
+            )
+            if verbose or problems:
+                self.stdout.write(plan)
+            if problems:
+                failures.append(name)
+        return failures
@@ -0,0 +1,48 @@
+import posixpath
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from recipes.storage import referenced_files
+
+MEDIA_DIRECTORY = 'recipes'
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from walk(storage, posixpath.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = 'Delete recipe media files not referenced by any recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе указанного числа секунд'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not storage.exists(MEDIA_DIRECTORY):
+            return
+        referenced = referenced_files()
+        threshold = time.time() - options['min_age']
+        removed = freed = 0
+        for name in walk(storage, MEDIA_DIRECTORY):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name).timestamp() > threshold:
+                continue
+            freed += storage.size(name)
+            removed += 1
+            if not options['dry_run']:
+                storage.delete(name)
+        self.stdout.write(
+            f'Удалено файлов: {removed}, освобождено {freed / 2**20:.1f} МБ'
+            + (' (пробный запуск)' if options['dry_run'] else '')
+        )
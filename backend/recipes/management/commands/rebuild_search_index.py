@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import Recipe
+from recipes.search import create_search_structures, update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        create_search_structures()
+        ids = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+        with transaction.atomic():
+            for offset in range(0, len(ids), options['batch_size']):
+                update_search_index(
+                    ids[offset:offset + options['batch_size']]
+                )
+        self.stdout.write(
+            f'Проиндексировано рецептов: {len(ids)} '
+            f'за {time.perf_counter() - start:.1f} с'
+        )
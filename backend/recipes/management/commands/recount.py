@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+)
+
+
+def actual_count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        Value(0)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized counters of recipes and users'
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in COUNTERS:
+            drifted = model.objects.annotate(
+                actual=actual_count(related_model, field)
+            ).exclude(**{counter: F('actual')})
+            fixed = model.objects.filter(
+                pk__in=list(drifted.values_list('pk', flat=True))
+            ).update(**{counter: actual_count(related_model, field)})
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: исправлено {fixed}'
+            )
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.rankings import BATCH_SIZE, refresh_rankings
+
+
+class Command(BaseCommand):
+    help = ('Refresh popular and trending rankings of recipes changed '
+            'since the previous run')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинги всех рецептов'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = refresh_rankings(options['full'], options['batch_size'])
+        self.stdout.write(
+            f'Пересчитано рейтингов: {count} '
+            f'за {time.perf_counter() - start:.1f} с'
+        )
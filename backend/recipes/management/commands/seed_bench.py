@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.benchmark import BATCH_SIZE, BENCH_PREFIX, dataset_size, seed
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for load tests and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--authors', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее сгенерированные данные перед запуском'
+        )
+
+    def handle(self, *args, **options):
+        bench_users = User.objects.filter(username__startswith=BENCH_PREFIX)
+        if bench_users.exists() and not options['clear']:
+            raise CommandError(
+                'Данные для замеров уже есть, используйте --clear'
+            )
+        start = time.perf_counter()
+        with transaction.atomic():
+            bench_users.delete()
+            seed(
+                options['recipes'], options['authors'], options['users'],
+                random_seed=options['seed'],
+                batch_size=options['batch_size']
+            )
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - start:.1f} с: ' + ', '.join(
+                f'{name} {count}' for name, count in dataset_size().items()
+            )
+        )
@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Явная модель связи тегов и рецептов поверх существующей таблицы.
+
+    recipes_recipe_tags с уникальностью (recipe_id, tag_id) уже создана
+    автоматической связью ManyToManyField, поэтому модель и through
+    меняются только в состоянии миграций, а в базе добавляется лишь
+    индекс (tag_id, recipe_id) для фильтра по тегам.
+    """
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='TagInRecipe',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_tags', to='recipes.recipe')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_recipes', to='recipes.tag', verbose_name='Тег')),
+                    ],
+                    options={
+                        'verbose_name': 'Тег рецепта',
+                        'verbose_name_plural': 'Теги рецептов',
+                        'db_table': 'recipes_recipe_tags',
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='tags',
+                    field=models.ManyToManyField(through='recipes.TagInRecipe', to='recipes.Tag', verbose_name='Теги'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='taginrecipe',
+            index=models.Index(fields=['tag', 'recipe'], name='tag_recipe_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import (Exists, F, OuterRef, Prefetch, UniqueConstraint,
+                              Value, Window)
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 from foodgram.global_constants import (MAX_AMOUNT_INGRIDIENTS,
                                        MAX_LENGTH_AUTHOR,
                                        MAX_LENGTH_INGREDIENT_MEAUNIT,
@@ -9,12 +13,61 @@ from foodgram.global_constants import (MAX_AMOUNT_INGRIDIENTS,
                                        MAX_LENGTH_RECIPE_NAME,
                                        MAX_LENGTH_TAG_COLOR,
                                        MAX_LENGTH_TAG_NAME,
-                                       MAX_LENGTH_TAG_SLUG, MAX_TIME_COOKING,
+                                       MAX_LENGTH_TAG_SLUG, MAX_SERVINGS,
+                                       MAX_TIME_COOKING,
                                        MIN_AMOUNT_INGRIDIENTS,
                                        MIN_TIME_COOKING)
 from users.models import User
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам."""
+
+    def with_related(self):
+        """Автор, теги и ингредиенты, нужные для вывода рецепта."""
+        return self.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.all()),
+            Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredients'
+                ).order_by('ingredients__name', 'id')
+            )
+        )
+
+    def latest_per_author(self, limit):
+        """Последние limit рецептов каждого автора одним запросом."""
+        ranked = self.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )).order_by()
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+            'ORDER BY ranked.pub_date DESC, ranked.id DESC',
+            (*params, limit)
+        )
+
+    def with_user_flags(self, user):
+        """Отметки избранного и корзины для пользователя в одном запросе."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()
+                )
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                recipe=OuterRef('pk'), user=user
+            ))
+        )
+
+
 class Recipe(models.Model):
     """Рецепты"""
     author = models.ForeignKey(
@@ -34,6 +87,12 @@ class Recipe(models.Model):
         blank=True,
         null=True
     )
+    image_variants = models.JSONField(
+        verbose_name='Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(
         verbose_name='Текст',
     )
@@ -44,7 +103,8 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(
         'Tag',
-        verbose_name='Теги'
+        verbose_name='Теги',
+        through='TagInRecipe'
     )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (минут)',
@@ -61,11 +121,34 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый документ',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx')]
 
     def __str__(self):
         return self.name
@@ -160,6 +243,33 @@ class IngredientInRecipe(models.Model):
         return f'{self.ingredients}: {self.amount}'
 
 
+class TagInRecipe(models.Model):
+    """ Модель связи тега и рецепта. """
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='recipe_tags',
+        on_delete=models.CASCADE
+    )
+    tag = models.ForeignKey(
+        Tag,
+        related_name='tag_recipes',
+        on_delete=models.CASCADE,
+        verbose_name='Тег'
+    )
+
+    class Meta:
+        # Таблица и уникальность (recipe, tag) остались от автоматической
+        # связи, см. миграцию 0003_tag_in_recipe.
+        db_table = 'recipes_recipe_tags'
+        verbose_name = 'Тег рецепта'
+        verbose_name_plural = 'Теги рецептов'
+        indexes = [
+            models.Index(fields=['tag', 'recipe'], name='tag_recipe_idx')]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.tag}'
+
+
 class UserInRecipe(models.Model):
     """Abstract model for Favorite and ShoppingCart"""
     recipe = models.ForeignKey(
@@ -172,6 +282,11 @@ class UserInRecipe(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Пользователь',
     )
+    added = models.DateTimeField(
+        verbose_name='Добавлено',
+        default=timezone.now,
+        editable=False
+    )
 
     class Meta:
         abstract = True
@@ -190,10 +305,25 @@ class Favorite(UserInRecipe):
                 fields=['recipe', 'user'],
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='favorite_user_recipe_idx'),
+            models.Index(fields=['added'], name='favorite_added_idx'),
+        ]
 
 
 class ShoppingCart(UserInRecipe):
     """ Модель корзины. """
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Множитель порций',
+        default=1,
+        validators=[
+            MinValueValidator(1, 'Не менее 1 порции'),
+            MaxValueValidator(
+                MAX_SERVINGS, f'Не более {MAX_SERVINGS} порций'
+            )
+        ]
+    )
 
     class Meta:
         verbose_name = 'Корзина покупок'
@@ -205,4 +335,74 @@ class ShoppingCart(UserInRecipe):
                 fields=['recipe', 'user'],
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'], name='cart_user_recipe_idx'),
+        ]
         verbose_name = 'Список покупок'
+
+
+class RecipeRank(models.Model):
+    """Рейтинги рецептов, пересчитываемые командой refresh_rankings."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт'
+    )
+    favorites = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0
+    )
+    carts = models.PositiveIntegerField(
+        verbose_name='В корзинах', default=0
+    )
+    popular = models.PositiveIntegerField(
+        verbose_name='Популярность', default=0
+    )
+    trending = models.FloatField(
+        verbose_name='Актуальность', default=0
+    )
+    refreshed = models.DateTimeField(
+        verbose_name='Пересчитано', default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'], name='rank_popular_idx'),
+            models.Index(
+                fields=['-trending', '-recipe'], name='rank_trending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular}, {self.trending:.2f}'
+
+
+class RecipeNeighbors(models.Model):
+    """Похожие рецепты, посчитанные командой build_recommendations."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='neighbors',
+        verbose_name='Рецепт'
+    )
+    recipe_ids = models.JSONField(
+        verbose_name='Похожие рецепты', default=list
+    )
+    scores = models.JSONField(
+        verbose_name='Оценки сходства', default=list
+    )
+    built = models.DateTimeField(
+        verbose_name='Посчитано', default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Похожие рецепты'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.recipe_ids}'
@@ -0,0 +1,260 @@
+import itertools
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .models import (Favorite, IngredientInRecipe, Recipe, RecipeNeighbors,
+                     ShoppingCart, TagInRecipe)
+
+CART_WEIGHT = 0.5
+CO_OCCURRENCE_WEIGHT = 0.6
+INGREDIENT_WEIGHT = 0.3
+TAG_WEIGHT = 0.1
+MAX_INGREDIENT_SHARE = 0.02
+MIN_INGREDIENT_RECIPES = 100
+MAX_BLOCK_PAIRS = 10_000_000
+BATCH_SIZE = 2000
+
+
+def l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return (sparse.diags((1 / norms).astype(np.float32)) @ matrix).tocsr()
+
+
+def interaction_matrix(n_recipes, users, recipes, weights):
+    """Рецепты x пользователи; вклад самых активных пользователей снижен."""
+    _, users = np.unique(users, return_inverse=True)
+    degrees = np.bincount(users)
+    matrix = sparse.csr_matrix(
+        (weights.astype(np.float32), (recipes, users)),
+        shape=(n_recipes, len(degrees))
+    )
+    return l2_normalize(matrix @ sparse.diags(
+        (1 / np.log2(2 + degrees)).astype(np.float32)
+    ))
+
+
+def ingredient_matrix(n_recipes, recipes, ingredients):
+    """Рецепты x ингредиенты с весами IDF.
+
+    Ингредиенты из большой доли рецептов (соль, вода) почти не влияют
+    на сходство, но дают больше всего пар, поэтому отбрасываются.
+    """
+    _, ingredients = np.unique(ingredients, return_inverse=True)
+    frequency = np.bincount(ingredients)
+    keep = frequency[ingredients] <= max(
+        MAX_INGREDIENT_SHARE * n_recipes, MIN_INGREDIENT_RECIPES
+    )
+    idf = np.log(n_recipes / frequency).astype(np.float32)
+    return l2_normalize(sparse.csr_matrix(
+        (idf[ingredients][keep], (recipes[keep], ingredients[keep])),
+        shape=(n_recipes, len(frequency))
+    ))
+
+
+def tag_profiles(n_recipes, recipes, tags):
+    """Набор тегов каждого рецепта и косинусы между наборами.
+
+    Различных наборов тегов мало, поэтому сходство пары рецептов по
+    тегам - одна выборка из маленькой таблицы.
+    """
+    _, tags = np.unique(tags, return_inverse=True)
+    matrix = np.zeros((n_recipes, tags.max() + 1 if len(tags) else 0),
+                      dtype=np.float32)
+    matrix[recipes, tags] = 1
+    sets, profiles = np.unique(matrix, axis=0, return_inverse=True)
+    norms = np.linalg.norm(sets, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    sets /= norms
+    return profiles.ravel(), sets @ sets.T
+
+
+def row_costs(matrix, transposed):
+    """Оценка числа пар, которые даст каждая строка произведения."""
+    pattern = sparse.csr_matrix(
+        (np.ones(len(matrix.data)), matrix.indices, matrix.indptr),
+        shape=matrix.shape
+    )
+    return pattern @ np.diff(transposed.indptr).astype(np.float64)
+
+
+def row_blocks(costs, limit):
+    """Границы блоков строк, дающих не больше limit пар."""
+    cumulative = np.cumsum(costs)
+    start = 0
+    while start < len(costs):
+        done = cumulative[start - 1] if start else 0
+        stop = max(
+            int(np.searchsorted(cumulative, done + limit, side='right')),
+            start + 1
+        )
+        yield start, stop
+        start = stop
+
+
+def top_k(row, cols, scores, tags, k):
+    """k лучших соседей строки по убыванию оценки.
+
+    Косинус тегов добавляет к оценке не больше TAG_WEIGHT, поэтому
+    он считается только для кандидатов, которые могут войти в top-k.
+    """
+    profiles, similarity = tags
+    if len(scores) > k:
+        chosen = scores >= np.partition(scores, -k)[-k] - TAG_WEIGHT
+        cols, scores = cols[chosen], scores[chosen]
+    scores = scores + TAG_WEIGHT * similarity[profiles[row], profiles[cols]]
+    if len(scores) > k:
+        chosen = np.argpartition(-scores, k - 1)[:k]
+        cols, scores = cols[chosen], scores[chosen]
+    order = np.argsort(-scores, kind='stable')
+    return cols[order], scores[order]
+
+
+def build_neighbors(n_recipes, interactions, ingredients, tags, k):
+    """Top-k похожих рецептов для каждого рецепта.
+
+    Сходство - взвешенная сумма косинусов по совместным добавлениям
+    в избранное и корзину, по ингредиентам и по тегам. Кандидаты дают
+    первые два слагаемых: произведение разреженных матриц считается
+    блоками строк, чтобы число пар в памяти не превышало MAX_BLOCK_PAIRS.
+    Возвращает массивы (строка, столбец, оценка) с индексами рецептов.
+    """
+    co = interaction_matrix(n_recipes, *interactions)
+    co_t = co.T.tocsr()
+    ingredient = ingredient_matrix(n_recipes, *ingredients)
+    ingredient_t = ingredient.T.tocsr()
+    tags = tag_profiles(n_recipes, *tags)
+    costs = row_costs(co, co_t) + row_costs(ingredient, ingredient_t)
+    rows, cols, scores = [], [], []
+    for start, stop in row_blocks(costs, MAX_BLOCK_PAIRS):
+        block = (
+            CO_OCCURRENCE_WEIGHT * (co[start:stop] @ co_t)
+            + INGREDIENT_WEIGHT * (ingredient[start:stop] @ ingredient_t)
+        ).tocsr()
+        for row in range(start, stop):
+            found = slice(
+                block.indptr[row - start], block.indptr[row - start + 1]
+            )
+            other = block.indices[found] != row
+            if not other.any():
+                continue
+            row_cols, row_scores = top_k(
+                row, block.indices[found][other], block.data[found][other],
+                tags, k
+            )
+            rows.append(np.full(len(row_cols), row))
+            cols.append(row_cols)
+            scores.append(row_scores)
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float32)
+    return (
+        np.concatenate(rows), np.concatenate(cols).astype(np.int64),
+        np.concatenate(scores)
+    )
+
+
+def pairs(queryset):
+    return np.fromiter(
+        itertools.chain.from_iterable(queryset.iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def load_dataset():
+    """id рецептов и связи из базы с индексами рецептов вместо id."""
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64
+    )
+
+    def indexed(queryset):
+        values, ids = pairs(queryset).T
+        positions = np.searchsorted(recipe_ids, ids)
+        known = positions < len(recipe_ids)
+        known[known] = recipe_ids[positions[known]] == ids[known]
+        return values[known], positions[known]
+
+    favorite_users, favorites = indexed(
+        Favorite.objects.values_list('user_id', 'recipe_id')
+    )
+    cart_users, carts = indexed(
+        ShoppingCart.objects.values_list('user_id', 'recipe_id')
+    )
+    ingredients, ingredient_recipes = indexed(
+        IngredientInRecipe.objects.values_list('ingredients_id', 'recipe_id')
+    )
+    tags, tag_recipes = indexed(
+        TagInRecipe.objects.values_list('tag_id', 'recipe_id')
+    )
+    interactions = (
+        np.concatenate((favorite_users, cart_users)),
+        np.concatenate((favorites, carts)),
+        np.concatenate((
+            np.ones(len(favorites), dtype=np.float32),
+            np.full(len(carts), CART_WEIGHT, dtype=np.float32)
+        ))
+    )
+    return (
+        recipe_ids, interactions, (ingredient_recipes, ingredients),
+        (tag_recipes, tags)
+    )
+
+
+def synthetic_dataset(recipes_count, favorites_count, random_seed=None):
+    """Данные того же вида со степенными распределениями, без базы."""
+    rng = np.random.default_rng(random_seed)
+
+    def zipf(count, size):
+        weights = 1 / np.arange(1, count + 1) ** 1.1
+        return rng.choice(count, size, p=weights / weights.sum())
+
+    def per_recipe(low, high, choices):
+        counts = rng.integers(low, high + 1, recipes_count)
+        return (
+            np.repeat(np.arange(recipes_count), counts),
+            zipf(choices, counts.sum())
+        )
+
+    users_count = max(favorites_count // 20, 1)
+    user_weights = rng.pareto(1.2, users_count) + 1
+    user_weights /= user_weights.sum()
+    carts_count = favorites_count // 5
+    interactions_count = favorites_count + carts_count
+    interactions = (
+        rng.choice(users_count, interactions_count, p=user_weights),
+        zipf(recipes_count, interactions_count),
+        np.r_[
+            np.ones(favorites_count, dtype=np.float32),
+            np.full(carts_count, CART_WEIGHT, dtype=np.float32)
+        ]
+    )
+    return (
+        np.arange(1, recipes_count + 1), interactions,
+        per_recipe(3, 12, 2000), per_recipe(1, 3, 10)
+    )
+
+
+def save_neighbors(recipe_ids, rows, cols, scores, batch_size=BATCH_SIZE):
+    """Заменить сохранённые соседства рецептов новыми."""
+    now = timezone.now()
+    if len(rows):
+        starts = np.flatnonzero(np.r_[True, np.diff(rows) != 0])
+    else:
+        starts = np.array([], dtype=np.int64)
+    stops = np.r_[starts[1:], len(rows)].astype(np.int64)
+    neighbors = (
+        RecipeNeighbors(
+            recipe_id=int(recipe_ids[rows[start]]),
+            recipe_ids=recipe_ids[cols[start:stop]].tolist(),
+            scores=np.round(scores[start:stop].astype(np.float64), 4).tolist(),
+            built=now
+        )
+        for start, stop in zip(starts, stops)
+    )
+    with transaction.atomic():
+        RecipeNeighbors.objects.all().delete()
+        RecipeNeighbors.objects.bulk_create(neighbors, batch_size=batch_size)
+    return len(starts)
@@ -0,0 +1,107 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from foodgram.global_constants import TRENDING_HALF_LIFE_DAYS
+
+from .models import Favorite, Recipe, RecipeRank
+from .versions import RANKINGS_VERSION, bump_version
+
+RANKINGS = ('popular', 'trending')
+TRENDING_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 2000
+
+
+def trending_score(times):
+    """Актуальность по датам добавления в избранное.
+
+    Вклад каждого добавления вдвое падает за TRENDING_HALF_LIFE_DAYS.
+    Хранится log2(1 + сумма 2^(возраст от эпохи / период)): отношение
+    затухающих сумм двух рецептов со временем не меняется, поэтому
+    старые оценки остаются сравнимыми с новыми и их не нужно
+    пересчитывать по расписанию.
+    """
+    half_life = TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60
+    exponents = [
+        (added - TRENDING_EPOCH).total_seconds() / half_life
+        for added in times
+    ]
+    if not exponents:
+        return 0.0
+    top = max(0, *exponents)
+    return top + math.log2(
+        2 ** -top + sum(2 ** (exponent - top) for exponent in exponents)
+    )
+
+
+def changed_recipes(since):
+    """Рецепты без рейтинга, с новыми счётчиками или избранным с since."""
+    changed = set(Recipe.objects.filter(ranking__isnull=True).values_list(
+        'id', flat=True
+    ))
+    changed.update(Recipe.objects.filter(ranking__isnull=False).exclude(
+        favorites_count=F('ranking__favorites'), cart_count=F('ranking__carts')
+    ).values_list('id', flat=True))
+    if since is not None:
+        changed.update(Favorite.objects.filter(added__gte=since).values_list(
+            'recipe_id', flat=True
+        ))
+    return changed
+
+
+def refresh_rankings(full=False, batch_size=BATCH_SIZE):
+    """Пересчитать рейтинги изменившихся рецептов (или всех при full).
+
+    Возвращает число пересчитанных рецептов.
+    """
+    now = timezone.now()
+    if full:
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    else:
+        recipe_ids = sorted(changed_recipes(
+            RecipeRank.objects.aggregate(since=Max('refreshed'))['since']
+        ))
+    for offset in range(0, len(recipe_ids), batch_size):
+        refresh_batch(recipe_ids[offset:offset + batch_size], now)
+    if recipe_ids:
+        transaction.on_commit(lambda: bump_version(RANKINGS_VERSION))
+    return len(recipe_ids)
+
+
+def refresh_batch(recipe_ids, now):
+    times = defaultdict(list)
+    for recipe_id, added in Favorite.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'added').iterator():
+        times[recipe_id].append(added)
+    ranks = [
+        RecipeRank(
+            recipe_id=recipe_id,
+            favorites=favorites,
+            carts=carts,
+            popular=favorites + carts,
+            trending=trending_score(times[recipe_id]),
+            refreshed=now
+        )
+        for recipe_id, favorites, carts in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', 'favorites_count', 'cart_count')
+    ]
+    # Замена строк пачкой быстрее bulk_update с CASE по каждой строке.
+    with transaction.atomic():
+        RecipeRank.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeRank.objects.bulk_create(ranks)
+
+
+def order_by_ranking(queryset, ranking):
+    """Рецепты по рейтингу с обходом индекса таблицы рейтингов.
+
+    Строка рейтинга создаётся вместе с рецептом, поэтому внутреннее
+    соединение не теряет рецепты.
+    """
+    return queryset.filter(ranking__isnull=False).order_by(
+        f'-ranking__{ranking}', '-ranking__recipe_id'
+    )
@@ -0,0 +1,50 @@
+import heapq
+from collections import defaultdict
+
+from foodgram.global_constants import RECOMMENDATION_HISTORY
+
+from .models import Favorite, Recipe, RecipeNeighbors, ShoppingCart
+from .rankings import order_by_ranking
+
+
+def similar_recipes(recipe_id, limit):
+    """id рецептов, похожих на recipe_id, от самого похожего."""
+    recipe_ids = RecipeNeighbors.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('recipe_ids', flat=True).first()
+    return (recipe_ids or [])[:limit]
+
+
+def saved_recipes(user):
+    """Рецепты из избранного и корзины пользователя с датой добавления."""
+    saved = {}
+    for model in (Favorite, ShoppingCart):
+        for recipe_id, added in model.objects.filter(
+            user=user
+        ).values_list('recipe_id', 'added'):
+            saved[recipe_id] = max(added, saved.get(recipe_id, added))
+    return saved
+
+
+def recommended_recipes(user, limit):
+    """id рецептов, которые стоит предложить пользователю.
+
+    Оценки соседей последних RECOMMENDATION_HISTORY сохранённых рецептов
+    складываются, уже сохранённые рецепты пропускаются. Если соседей
+    не хватает (новый пользователь), список дополняют популярные рецепты.
+    """
+    saved = saved_recipes(user)
+    history = heapq.nlargest(RECOMMENDATION_HISTORY, saved, key=saved.get)
+    scores = defaultdict(float)
+    for recipe_ids, recipe_scores in RecipeNeighbors.objects.filter(
+        recipe_id__in=history
+    ).values_list('recipe_ids', 'scores'):
+        for recipe_id, score in zip(recipe_ids, recipe_scores):
+            if recipe_id not in saved:
+                scores[recipe_id] += score
+    chosen = heapq.nlargest(limit, scores, key=scores.get)
+    if len(chosen) < limit:
+        chosen += order_by_ranking(
+            Recipe.objects.exclude(id__in=[*saved, *chosen]), 'popular'
+        ).values_list('id', flat=True)[:limit - len(chosen)]
+    return chosen
@@ -0,0 +1,125 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+from .models import IngredientInRecipe, Recipe
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = (10.0, 3.0, 1.0)
+
+
+def search_terms(query):
+    """Слова запроса без операторов и знаков препинания."""
+    return re.findall(r'\w+', query.lower())
+
+
+def create_search_structures(using='default', **kwargs):
+    """Индекс полнотекстового поиска: GIN на Postgres, FTS5 на SQLite."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+                f'ON {Recipe._meta.db_table} USING gin (search_vector)'
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                'USING fts5(name, text, ingredients, '
+                "tokenize='unicode61')"
+            )
+
+
+def ingredient_names(recipe_ids):
+    names = {}
+    for recipe_id, name in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredients__name'):
+        names.setdefault(recipe_id, []).append(name)
+    return {recipe_id: ' '.join(items) for recipe_id, items in names.items()}
+
+
+def update_search_index(recipe_ids):
+    """Пересчитать поисковые документы рецептов."""
+    recipe_ids = list(recipe_ids)
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    if connection.vendor == 'postgresql':
+        names = IngredientInRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredients__name', ' ')
+        ).values('names')
+        recipes.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(Subquery(names, output_field=TextField()),
+                         Value('')),
+                weight='C', config=SEARCH_CONFIG
+            )
+        ))
+    elif connection.vendor == 'sqlite':
+        names = ingredient_names(recipe_ids)
+        rows = [
+            (recipe_id, name, text, names.get(recipe_id, ''))
+            for recipe_id, name, text in recipes.values_list(
+                'id', 'name', 'text'
+            )
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(recipe_id,) for recipe_id in recipe_ids]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                '(rowid, name, text, ingredients) VALUES (%s, %s, %s, %s)',
+                rows
+            )
+
+
+def remove_from_search_index(recipe_id):
+    """Убрать рецепт из FTS5; в Postgres документ удаляется вместе с ним."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (recipe_id,)
+            )
+
+
+def search_recipes(queryset, query):
+    """Отфильтровать рецепты по запросу и упорядочить по релевантности.
+
+    Последнее слово ищется по префиксу, чтобы поиск работал при наборе.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            ' & '.join(terms) + ':*',
+            config=SEARCH_CONFIG, search_type='raw'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-pub_date')
+    if connection.vendor != 'sqlite':
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term)
+        return queryset
+    match = ' '.join(f'"{term}"' for term in terms) + '*'
+    weights = ', '.join(map(str, FTS_WEIGHTS))
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {Recipe._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s'
+        ],
+        params=[match],
+        select={'rank': f'bm25({FTS_TABLE}, {weights})'},
+    ).order_by('rank', '-pub_date')
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import transaction
+from foodgram.global_constants import SHOPPING_LIST_CACHE_TIMEOUT
+
+from .models import ShoppingCart
+from .units import from_base, round_amount, to_base
+
+CACHE_KEY = 'shopping_list:v2:{}'
+
+
+def shopping_list_queryset(user):
+    """Строки корзины: порции, рецепт и ингредиент одним соединением."""
+    return ShoppingCart.objects.filter(user=user).order_by().values_list(
+        'servings',
+        'recipe__name',
+        'recipe__recipe_ingredients__amount',
+        'recipe__recipe_ingredients__ingredients__name',
+        'recipe__recipe_ingredients__ingredients__measurement_unit',
+    )
+
+
+def aggregate(rows):
+    """Свести строки корзины в список покупок за один проход.
+
+    Количество умножается на порции и переводится в базовую единицу,
+    поэтому «г» и «кг» или «ч. л.» и «ст. л.» одного ингредиента
+    складываются в одну строку. Если в строке была одна единица,
+    она и остаётся, иначе выбирается самая крупная подходящая.
+    """
+    lines = {}
+    for servings, recipe, amount, name, unit in rows:
+        if name is None:
+            continue
+        total, base = to_base(amount * servings, unit)
+        line = lines.get((name, base))
+        if line is None:
+            line = lines[name, base] = [0, set(), []]
+        line[0] += total
+        line[1].add(unit)
+        if recipe not in line[2]:
+            line[2].append(recipe)
+    ingredients = []
+    for (name, base), (total, units, recipes) in sorted(lines.items()):
+        if len(units) == 1:
+            unit = next(iter(units))
+            amount = total / to_base(1, unit)[0]
+        else:
+            amount, unit = from_base(total, base)
+        ingredients.append(dict(
+            name=name,
+            amount=round_amount(amount),
+            measurement_unit=unit,
+            recipes=sorted(recipes)
+        ))
+    return ingredients
+
+
+def get_shopping_list(user):
+    """Сводный список ингредиентов из корзины пользователя (с кэшем)."""
+    key = CACHE_KEY.format(user.id)
+    ingredients = cache.get(key)
+    if ingredients is None:
+        ingredients = aggregate(shopping_list_queryset(user).iterator())
+        cache.set(key, ingredients, SHOPPING_LIST_CACHE_TIMEOUT)
+    return ingredients
+
+
+def invalidate_shopping_lists(user_ids):
+    """Сбросить кэш списков покупок пользователей после коммита.
+
+    Сброс до коммита позволил бы параллельной выгрузке снова положить
+    в кэш старый список.
+    """
+    keys = [CACHE_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_recipe(recipe_id):
+    """Сбросить кэш у всех, у кого рецепт лежит в корзине."""
+    invalidate_shopping_lists(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        )
+    )
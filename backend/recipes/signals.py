@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import User
+
+from .coverage_index import recipe_changed as coverage_changed
+from .images import SOURCE, image_queue
+from .models import (Ingredient, IngredientInRecipe, Recipe, RecipeRank,
+                     ShoppingCart, Tag)
+from .search import remove_from_search_index, update_search_index
+from .shopping_cart import invalidate_recipe, invalidate_shopping_lists
+from .storage import release
+from .versions import (AUTHOR_RECIPES_VERSION, AUTHOR_VERSION,
+                       INGREDIENTS_VERSION, RECIPE_VERSION, RECIPES_VERSION,
+                       TAGS_VERSION, bump_version, bump_versions)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_lists([instance.user_id])
+
+
+def image_files(image, variants):
+    return [image, *(variants or {}).values()] if image else []
+
+
+def release_files(storage, names):
+    if names:
+        transaction.on_commit(lambda: release(storage, names))
+
+
+def bump_after_commit(*names):
+    transaction.on_commit(lambda: bump_versions(names))
+
+
+def reindex(recipe_id):
+    transaction.on_commit(lambda: update_search_index([recipe_id]))
+    transaction.on_commit(lambda: coverage_changed(recipe_id))
+    bump_after_commit(RECIPES_VERSION, RECIPE_VERSION.format(recipe_id))
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    instance._previous_image = Recipe.objects.filter(
+        pk=instance.pk
+    ).values_list('image', 'image_variants').first() if instance.pk else None
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if created:
+        RecipeRank.objects.create(recipe=instance)
+    else:
+        invalidate_recipe(instance.id)
+    reindex(instance.id)
+    bump_after_commit(AUTHOR_RECIPES_VERSION.format(instance.author_id))
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous[0] != instance.image.name:
+        release_files(instance.image.storage, image_files(*previous))
+    if (instance.image
+            and instance.image_variants.get(SOURCE) != instance.image.name):
+        transaction.on_commit(lambda: image_queue.put(instance.id))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    remove_from_search_index(instance.id)
+    recipe_id = instance.id
+    transaction.on_commit(lambda: coverage_changed(recipe_id))
+    bump_after_commit(
+        RECIPES_VERSION, RECIPE_VERSION.format(recipe_id),
+        AUTHOR_RECIPES_VERSION.format(instance.author_id)
+    )
+    release_files(
+        instance.image.storage,
+        image_files(instance.image.name, instance.image_variants)
+    )
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+    reindex(instance.recipe_id)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    bump_after_commit(AUTHOR_VERSION.format(instance.id))
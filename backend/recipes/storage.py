@@ -0,0 +1,79 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются по SHA-256 содержимого.
+
+    Повторная загрузка того же файла не создаёт копию: возвращается имя
+    уже сохранённого файла. Удалять файлы нужно с учётом ссылок на них
+    (recipes.storage.release, команда gc_media).
+    """
+
+    @staticmethod
+    def content_name(name, content):
+        """Имя, под которым content будет сохранён в каталоге name."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def referenced_files():
+    """Имена всех файлов, на которые ссылаются рецепты."""
+    from .models import Recipe
+
+    names = set()
+    for image, variants in Recipe.objects.exclude(image='').exclude(
+        image=None
+    ).values_list('image', 'image_variants').iterator():
+        names.add(image)
+        names.update((variants or {}).values())
+    return names
+
+
+def referenced(names):
+    """Имена из names, на которые ссылается хотя бы один рецепт.
+
+    Варианты с одинаковым содержимым общие у рецептов с одинаковым
+    изображением, поэтому учитываются и ссылки из image_variants, но
+    только актуальные: собранные из текущего изображения рецепта.
+    """
+    from .images import SOURCE, VARIANTS
+    from .models import Recipe
+
+    query = Q(image__in=names)
+    for key in (SOURCE, *VARIANTS):
+        query |= Q(**{f'image_variants__{key}__in': names})
+    used = set()
+    for image, variants in Recipe.objects.filter(query).values_list(
+        'image', 'image_variants'
+    ).iterator():
+        used.add(image)
+        if (variants or {}).get(SOURCE) == image:
+            used.update(variants.values())
+    return used
+
+
+def release(storage, names):
+    """Удалить файлы, на которые больше не ссылается ни один рецепт."""
+    names = {name for name in names if name}
+    for name in names - referenced(names):
+        storage.delete(name)
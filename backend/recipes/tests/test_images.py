@@ -0,0 +1,100 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from api.serializers import RecipeCreateUpdateSerializer
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes.images import SOURCE, VARIANTS, build_variants
+from recipes.models import Recipe
+from recipes.storage import ContentAddressedStorage
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_file(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='image.png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_SYNC=True)
+class ImageVariantsTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='password'
+        )
+
+    def create_recipe(self, color='red'):
+        return Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10, image=image_file(color)
+        )
+
+    def test_rebuild_of_same_image_is_skipped(self):
+        recipe = self.create_recipe()
+        variants = build_variants(recipe.id)
+        self.assertEqual(variants[SOURCE], recipe.image.name)
+        self.assertEqual(set(variants) - {SOURCE}, set(VARIANTS))
+        with mock.patch('recipes.images.render_variant') as render:
+            self.assertEqual(build_variants(recipe.id), variants)
+        render.assert_not_called()
+
+    def test_missing_variant_file_is_rebuilt(self):
+        recipe = self.create_recipe()
+        variants = build_variants(recipe.id)
+        recipe.image.storage.delete(variants['card'])
+        self.assertEqual(build_variants(recipe.id), variants)
+        self.assertTrue(recipe.image.storage.exists(variants['card']))
+
+    def files(self, variants):
+        return {
+            name: self.storage.exists(name) for name in variants.values()
+        }
+
+    def test_shared_files_survive_deleting_one_recipe(self):
+        first, second = self.create_recipe(), self.create_recipe()
+        self.assertEqual(first.image.name, second.image.name)
+        variants = build_variants(first.id)
+        self.assertEqual(build_variants(second.id), variants)
+        self.storage = first.image.storage
+        first.refresh_from_db()
+        second.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(self.files(variants).values()))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(any(self.files(variants).values()))
+
+    def test_image_change_releases_previous_files(self):
+        recipe = self.create_recipe()
+        variants = build_variants(recipe.id)
+        self.storage = recipe.image.storage
+        recipe.refresh_from_db()
+        recipe.image = image_file('green')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertFalse(any(self.files(variants).values()))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants[SOURCE], recipe.image.name)
+        self.assertTrue(all(self.files(recipe.image_variants).values()))
+
+    def test_same_image_is_detected_without_reading_storage(self):
+        recipe = self.create_recipe()
+        same = RecipeCreateUpdateSerializer.is_same_image
+        with mock.patch.object(
+            ContentAddressedStorage, 'open', side_effect=AssertionError
+        ):
+            self.assertTrue(same(image_file('red'), recipe.image))
+            self.assertFalse(same(image_file('green'), recipe.image))
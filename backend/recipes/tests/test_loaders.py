@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.loaders import IngredientLoader, TagLoader
+from recipes.models import Ingredient, Tag
+from recipes.versions import TAGS_VERSION, get_version
+
+
+class LoaderTest(TestCase):
+    """Статистика загрузки считается по тому, что попало в таблицу."""
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def test_conflicting_rows_are_skipped(self):
+        version = get_version(TAGS_VERSION)
+        stats = TagLoader().load([
+            dict(name='Завтрак', color='#000000', slug='morning'),
+            dict(name='Ужин', color='#E26C2D', slug='dinner'),
+        ])
+        self.assertEqual(
+            stats, dict(rows=2, inserted=0, updated=0, skipped=2))
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertEqual(get_version(TAGS_VERSION), version)
+
+    def test_insert_update_and_duplicates(self):
+        stats = TagLoader(batch_size=2).load([
+            dict(name='Обед', color='#49B64E', slug='lunch'),
+            dict(name='Завтрак', color='#8775D2', slug='breakfast'),
+            dict(name='Обед', color='#49B64E', slug='lunch'),
+            dict(name='', color='#000000', slug='empty'),
+        ])
+        self.assertEqual(
+            stats, dict(rows=4, inserted=1, updated=1, skipped=2))
+        self.assertEqual(
+            Tag.objects.get(slug='breakfast').color, '#8775D2')
+
+    def test_dry_run_keeps_table(self):
+        stats = IngredientLoader(dry_run=True).load([
+            dict(name='Соль', measurement_unit='г'),
+        ])
+        self.assertEqual(stats['inserted'], 1)
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,51 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from recipes.models import Recipe, TagInRecipe
+
+BASELINE = [('users', '0001_initial'), ('recipes', '0002_initial')]
+
+
+class UpgradeFromBaselineTest(TransactionTestCase):
+    """База со схемой до появления TagInRecipe обновляется миграциями."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_tags_survive_upgrade(self):
+        apps = self.migrate(BASELINE)
+        user = apps.get_model('users', 'User').objects.create(
+            username='author', email='author@example.com'
+        )
+        tags = [
+            apps.get_model('recipes', 'Tag').objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(2)
+        ]
+        recipe = apps.get_model('recipes', 'Recipe').objects.create(
+            author=user, name='Рецепт', text='Описание', cooking_time=10
+        )
+        recipe.tags.set(tags)
+
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+        self.assertEqual(
+            set(Recipe.objects.get(pk=recipe.pk).tags.values_list(
+                'slug', flat=True)),
+            {'tag0', 'tag1'}
+        )
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, TagInRecipe._meta.db_table
+            )
+        self.assertIn('tag_recipe_idx', indexes)
+        self.assertTrue(any(
+            info['unique'] and info['columns'] == ['recipe_id', 'tag_id']
+            for info in indexes.values()
+        ))
@@ -0,0 +1,39 @@
+import io
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from recipes.benchmark import seed
+from recipes.management.commands.check_query_plans import (explain,
+                                                           hot_queries,
+                                                           plan_problems)
+from recipes.models import Recipe
+
+
+class QueryPlansTest(TestCase):
+    """Горячие запросы используют индексы (EXPLAIN без полных сканов)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = seed(400, 20, random_seed=0)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_query_plans(self):
+        for name, sql, params, allow_sort in hot_queries(self.viewer):
+            with self.subTest(name):
+                plan = explain(sql, params)
+                self.assertEqual(plan_problems(plan, allow_sort), [], plan)
+
+    def test_full_scan_is_reported(self):
+        sql, params = Recipe.objects.filter(
+            text='Описание'
+        ).order_by().query.sql_with_params()
+        self.assertTrue(plan_problems(explain(sql, params), False))
+
+    def test_command_with_existing_bench_data(self):
+        with self.assertRaisesMessage(CommandError, '--existing'):
+            call_command('check_query_plans', stdout=io.StringIO())
+        output = io.StringIO()
+        call_command('check_query_plans', '--existing', stdout=output)
+        self.assertNotIn('FAIL', output.getvalue())
@@ -0,0 +1,44 @@
+"""Пересчёт единиц измерения для списка покупок.
+
+Таблица покрывает единицы из data/ingredients.json, которые однозначно
+переводятся в граммы или миллилитры; остальные (шт., пучок, по вкусу
+и т.п.) складываются только сами с собой.
+"""
+
+GRAM = 'г'
+MILLILITER = 'мл'
+
+UNITS = {
+    'г': (GRAM, 1),
+    'кг': (GRAM, 1000),
+    'мл': (MILLILITER, 1),
+    'л': (MILLILITER, 1000),
+    'капля': (MILLILITER, 0.05),
+    'ч. л.': (MILLILITER, 5),
+    'ст. л.': (MILLILITER, 15),
+    'стакан': (MILLILITER, 250),
+}
+
+DISPLAY_UNITS = {
+    GRAM: (('кг', 1000), (GRAM, 1)),
+    MILLILITER: (('л', 1000), (MILLILITER, 1)),
+}
+
+
+def to_base(amount, unit):
+    """Количество в базовой единице и сама базовая единица."""
+    base, factor = UNITS.get(unit, (unit, 1))
+    return amount * factor, base
+
+
+def from_base(amount, base):
+    """Самая крупная единица, в которой количество не меньше единицы."""
+    for unit, factor in DISPLAY_UNITS.get(base, ()):
+        if amount >= factor:
+            return amount / factor, unit
+    return amount, base
+
+
+def round_amount(amount):
+    amount = round(amount, 2)
+    return int(amount) if amount == int(amount) else amount
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+RECIPES_VERSION = 'recipes'
+RANKINGS_VERSION = 'rankings'
+RECIPE_VERSION = 'recipe:{}'
+AUTHOR_VERSION = 'author:{}'
+AUTHOR_RECIPES_VERSION = 'author_recipes:{}'
+
+
+def get_version(name):
+    """Текущая версия набора данных.
+
+    Общая для всех процессов, если кэш общий. В кэше процесса версия
+    истекает через CACHE_VERSION_TIMEOUT, и данные перечитываются.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), settings.CACHE_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Сменить версию набора данных после изменения."""
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, settings.CACHE_VERSION_TIMEOUT)
+        return version
+
+
+def get_versions(names):
+    """Версии нескольких наборов данных одним обращением к кэшу."""
+    found = cache.get_many([VERSION_KEY.format(name) for name in names])
+    return {
+        name: found.get(VERSION_KEY.format(name)) or get_version(name)
+        for name in names
+    }
+
+
+def bump_versions(names):
+    for name in names:
+        bump_version(name)
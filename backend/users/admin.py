@@ -13,7 +13,7 @@ class UserAdmin(UserAdmin):
         'last_name',
         'username',
         'email',
-        'subscriptions_count',
+        'subscribers_count',
         'recipes_count'
     )
     list_display_links = (
@@ -23,14 +23,6 @@ class UserAdmin(UserAdmin):
         'username',
     )
 
-    @admin.display(description='Колличество подписок')
-    def subscriptions_count(self, user):
-        return user.author.count()
-
-    @admin.display(description='Колличество рецептов')
-    def recipes_count(self, user):
-        return user.recipes.count()
-
 
 @admin.register(Subscribe)
 class SubscriptionAdmin(admin.ModelAdmin):
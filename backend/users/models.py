@@ -24,6 +24,16 @@ class User(AbstractUser):
         max_length=MAX_LENGTH_EMAIL,
         unique=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('username',)